@@ -0,0 +1,104 @@
+# Micro-benchmark for intervals.py against the per-period string loops it replaced: the old
+# visualize_availability counting loop (split and one slice increment per period) and the old
+# adjust_availability_for_absences (strptime inside loops over schedules, periods and absences),
+# both of which ran on every request. The engine is timed in its two stages: "build" parses and
+# packs the schedules (done once per changed S3 object), "query" answers one day's counts.
+#
+#   python bench_intervals.py
+#   python bench_intervals.py --users 1000 5000 10000 --repeat 5
+#
+# Periods in the synthetic data never cross midnight or overlap, so both paths must produce the same counts.
+import argparse, random, time
+from datetime import datetime
+
+import numpy as np
+
+import intervals
+
+def synthetic_day(users, rng, absent_share=0.1):
+    # Each user's periods are disjoint: the old loop counted overlapping periods of one user twice
+    def periods(count):
+        bounds = sorted(rng.sample(range(0, 24 * 60, 5), 2 * count))
+        return [[f"{m // 60:02d}:{m % 60:02d}" for m in bounds[i:i + 2]] for i in range(0, len(bounds), 2)]
+    day_availability = {f"player{i}": periods(rng.randrange(1, 4)) for i in range(users)}
+    absences = {username: periods(rng.randrange(1, 3))
+                for username in rng.sample(sorted(day_availability), int(users * absent_share))}
+    return day_availability, absences
+
+def legacy_adjust(day_availability, absences):
+    adjusted = {}
+    for username, periods in day_availability.items():
+        if username not in absences:
+            adjusted[username] = periods
+            continue
+        new_periods = []
+        for scheduled_time in periods:
+            periods_to_add = [(datetime.strptime(scheduled_time[0], '%H:%M'), datetime.strptime(scheduled_time[1], '%H:%M'))]
+            for absence_time in absences[username]:
+                absence_start = datetime.strptime(absence_time[0], '%H:%M')
+                absence_end = datetime.strptime(absence_time[1], '%H:%M')
+                updated_periods = []
+                for start, end in periods_to_add:
+                    if start < absence_end and end > absence_start:
+                        if start < absence_start:
+                            updated_periods.append((start, min(end, absence_start)))
+                        if end > absence_end:
+                            updated_periods.append((max(start, absence_end), end))
+                    else:
+                        updated_periods.append((start, end))
+                periods_to_add = updated_periods
+            new_periods.extend([(start.strftime('%H:%M'), end.strftime('%H:%M')) for start, end in periods_to_add])
+        adjusted[username] = new_periods
+    return adjusted
+
+def legacy_counts(day_availability):
+    availability_counts = np.zeros(intervals.MINUTES_PER_DAY)
+    for periods in day_availability.values():
+        for period in periods:
+            start_hour, start_minute = map(int, period[0].split(':'))
+            end_hour, end_minute = map(int, period[1].split(':'))
+            availability_counts[start_hour * 60 + start_minute:end_hour * 60 + end_minute] += 1
+    return availability_counts
+
+def engine_build(day_availability):
+    # What AvailabilityMatrix.refresh does once per changed schedule: parse, mask and bit-pack
+    owners, starts, ends, _ = intervals.parse_period_lists(list(day_availability.values()))
+    return np.packbits(intervals.minute_masks(owners, starts, ends, len(day_availability)), axis=1)
+
+def engine_query(usernames, packed, absences):
+    # What AvailabilityMatrix.day_counts does per request: unpack, cut the absent rows, column-sum
+    masks = np.unpackbits(packed, axis=1).astype(bool)
+    absent = [index for index, username in enumerate(usernames) if username in absences]
+    absent_owners, absent_starts, absent_ends, _ = intervals.parse_period_lists([absences[usernames[index]] for index in absent])
+    masks[absent] &= ~intervals.minute_masks(absent_owners, absent_starts, absent_ends, len(absent))
+    return masks.sum(axis=0)
+
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the interval engine with the per-period loops it replaced.")
+    parser.add_argument('--users', type=int, nargs='+', default=[1000, 2500, 5000, 10000])
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement; the fastest is reported")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'users':>7}{'legacy ms':>11}{'build ms':>10}{'query ms':>10}{'query speedup':>15}")
+    for users in args.users:
+        day_availability, absences = synthetic_day(users, rng)
+        legacy_seconds, legacy = best_of(args.repeat, lambda: legacy_counts(legacy_adjust(day_availability, absences)))
+        build_seconds, packed = best_of(args.repeat, engine_build, day_availability)
+        query_seconds, engine = best_of(args.repeat, engine_query, list(day_availability), packed, absences)
+        if not np.array_equal(legacy, engine):
+            raise SystemExit(f"Counts differ at {users} users")
+        print(f"{users:>7}{1000 * legacy_seconds:>11.1f}{1000 * build_seconds:>10.1f}{1000 * query_seconds:>10.1f}"
+              f"{legacy_seconds / query_seconds:>14.1f}x")
+
+if __name__ == "__main__":
+    main()
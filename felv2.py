@@ -1,7 +1,36 @@
-import logging, os, io, json, numpy as np
-import matplotlib.pyplot as plt
-from datetime import datetime
-import boto3
+import time
+PROCESS_STARTED = time.perf_counter()  # Cold-start clock, reported once the bot is ready
+
+import logging, os, io, re, json, socket, struct, zlib, asyncio, threading, hashlib, itertools, functools, contextlib, signal, sqlite3, multiprocessing, importlib
+from datetime import datetime, timedelta
+from bisect import bisect_left, insort
+from collections import defaultdict, deque, OrderedDict
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# numpy, matplotlib and boto3 are only needed by the availability commands and the AWS-backed
+# features, so they are imported on first use instead of delaying every (re)connect
+class LazyModule:
+    # The first use usually comes from several executor threads at once, where importlib's LazyLoader
+    # (before Python 3.12) can hand one of them a half-initialised module; here the import runs under a lock
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attribute):
+        module = self._module
+        if module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+                module = self._module
+        return getattr(module, attribute)
+
+np = LazyModule('numpy')
+intervals = LazyModule('intervals')
 
 
 # Configure logging
@@ -18,44 +47,408 @@ from uuid import uuid4
 
 from dotenv import load_dotenv
 
-s3 = boto3.client('s3')
+# One boto3 session shared by every client; clients are built the first time they are needed
+aws_session_lock = threading.Lock()
+
+@functools.cache
+def aws_session():
+    import boto3
+    return boto3.session.Session()
+
+def aws_client(service, **kwargs):
+    # Session construction and client creation are not thread-safe, so serialize them
+    from botocore.config import Config
+    with aws_session_lock:
+        return aws_session().client(service, config=Config(**kwargs.pop('config', {})), **kwargs)
+
+def aws_resource(service, **kwargs):
+    from botocore.config import Config
+    with aws_session_lock:
+        return aws_session().resource(service, config=Config(**kwargs.pop('config', {})), **kwargs)
+
+# Bounded pool used to fetch S3 object bodies concurrently, off the event loop
+S3_MAX_WORKERS = int(os.getenv("S3_MAX_WORKERS", "16"))
+
+@functools.cache
+def s3_client():
+    return aws_client('s3', config={'max_pool_connections': S3_MAX_WORKERS})
+
+s3_executor = ThreadPoolExecutor(max_workers=S3_MAX_WORKERS, thread_name_prefix='s3')
 bucket_name = 'scheduling-bucket-felserver'
 url = 'https://dev.d1a0gyqelbcgth.amplifyapp.com/'
 
-# Assuming the boto3 DynamoDB resource is already set up
-dynamodb = boto3.resource('dynamodb', region_name='us-east-2')
-table = dynamodb.Table('felserver')
+# The DynamoDB table is opened on first use, like the S3 client
+DYNAMODB_MAX_WORKERS = int(os.getenv("DYNAMODB_MAX_WORKERS", "8"))
+
+@functools.cache
+def dynamodb_table():
+    dynamodb = aws_resource('dynamodb', region_name='us-east-2', config={'max_pool_connections': DYNAMODB_MAX_WORKERS, 'retries': {'mode': 'adaptive'}})
+    return dynamodb.Table('felserver')
+
+# Scale-out: SHARD_COUNT switches to an auto-sharded client, and SHARD_IDS lets each worker process
+# own a subset of the shards. Workers identify themselves by WORKER_ID in the shared state backend
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))
+SHARD_IDS = [int(shard_id) for shard_id in os.getenv("SHARD_IDS", "").split(",") if shard_id.strip()]
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+
+# Hash of the slash command definitions last pushed to Discord; unchanged sets skip the sync on (re)start
+COMMAND_HASH_FILE = 'command-hash.json'
+STARTUP_BENCHMARK = os.getenv("STARTUP_BENCHMARK", "0") == "1"  # Log cold-start timings and exit once ready
+
+def command_set_hash(bot):
+    commands_json = sorted(json.dumps([command.to_dict(), command.guild_ids], sort_keys=True, default=str) for command in bot.pending_application_commands)
+    return hashlib.blake2b(json.dumps([bot.application_id, commands_json]).encode(), digest_size=16).hexdigest()
+
+def read_command_hash():
+    try:
+        with open(COMMAND_HASH_FILE, 'r') as f:
+            return json.load(f)['hash']
+    except (OSError, ValueError, KeyError):
+        return None
+
+def write_command_hash(command_hash):
+    tmp_path = f"{COMMAND_HASH_FILE}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'hash': command_hash}, f)
+    os.replace(tmp_path, COMMAND_HASH_FILE)
+
+# Latency instrumentation: every slash command, component callback, gateway event and blocking
+# section lands in a fixed-bucket histogram, exported on a local Prometheus endpoint and /botstats
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 disables the HTTP endpoint
+LOOP_LAG_INTERVAL = 0.5
+
+class LatencyHistogram:
+    __slots__ = ('buckets', 'count', 'total', 'slowest')
 
-class PersistentViewBot(commands.Bot):
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.slowest = max(self.slowest, seconds)
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation
+        rank = q * self.count
+        for bound, cumulative in zip(LATENCY_BUCKETS, itertools.accumulate(self.buckets)):
+            if cumulative >= rank:
+                return bound
+        return self.slowest
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()  # Blocking sections are timed from executor threads
+        self.histograms = defaultdict(LatencyHistogram)  # (kind, name) -> latency
+        self.in_flight = defaultdict(int)  # (kind, name) -> calls running now
+        self.errors = defaultdict(int)  # (kind, name) -> calls that raised
+        self.loop_lag = LatencyHistogram()
+        self.sources = {}  # name -> callable returning a stats dict, exported as gauges
+
+    @contextlib.contextmanager
+    def timed(self, kind, name):
+        key = (kind, name)
+        with self.lock:
+            self.in_flight[key] += 1
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.in_flight[key] -= 1
+                self.histograms[key].observe(elapsed)
+            if failed:
+                self.record_error(kind, name)
+
+    def record_error(self, kind, name):
+        with self.lock:
+            self.errors[(kind, name)] += 1
+
+    async def watch_loop_lag(self):
+        # How late the loop wakes a sleeping task is how long something else held it
+        while True:
+            expected = time.perf_counter() + LOOP_LAG_INTERVAL
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            self.loop_lag.observe(max(0.0, time.perf_counter() - expected))
+
+    def snapshot(self):
+        with self.lock:
+            return ({key: (list(hist.buckets), hist.count, hist.total, hist.slowest) for key, hist in self.histograms.items()},
+                    dict(self.in_flight), dict(self.errors))
+
+    def render_prometheus(self):
+        histograms, in_flight, errors = self.snapshot()
+        lines = ["# TYPE felbot_latency_seconds histogram"]
+        for (kind, name), (buckets, count, total, _) in sorted(histograms.items()):
+            labels = f'kind="{kind}",name="{name}"'
+            for bound, cumulative in zip(LATENCY_BUCKETS, itertools.accumulate(buckets)):
+                lines.append(f'felbot_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'felbot_latency_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'felbot_latency_seconds_sum{{{labels}}} {total:.6f}')
+            lines.append(f'felbot_latency_seconds_count{{{labels}}} {count}')
+        lines.append("# TYPE felbot_in_flight gauge")
+        lines.extend(f'felbot_in_flight{{kind="{kind}",name="{name}"}} {value}' for (kind, name), value in sorted(in_flight.items()))
+        lines.append("# TYPE felbot_errors_total counter")
+        lines.extend(f'felbot_errors_total{{kind="{kind}",name="{name}"}} {value}' for (kind, name), value in sorted(errors.items()))
+        lines.append("# TYPE felbot_event_loop_lag_seconds histogram")
+        for bound, cumulative in zip(LATENCY_BUCKETS, itertools.accumulate(self.loop_lag.buckets)):
+            lines.append(f'felbot_event_loop_lag_seconds_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'felbot_event_loop_lag_seconds_bucket{{le="+Inf"}} {self.loop_lag.count}')
+        lines.append(f'felbot_event_loop_lag_seconds_sum {self.loop_lag.total:.6f}')
+        lines.append(f'felbot_event_loop_lag_seconds_count {self.loop_lag.count}')
+        lines.append("# TYPE felbot_component_stat gauge")
+        for source, stats in sorted(self.sources.items()):
+            for stat, value in stats().items():
+                if isinstance(value, (int, float)):
+                    lines.append(f'felbot_component_stat{{component="{source}",stat="{stat}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    async def handle_scrape(self, reader, writer):
+        try:
+            await reader.readuntil(b"\r\n\r\n")  # Any path is answered with the metrics page
+            body = self.render_prometheus().encode('utf-8')
+            writer.write(b"HTTP/1.0 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                         + f"Content-Length: {len(body)}\r\n\r\n".encode('ascii') + body)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, port):
+        # Bound to localhost only; scrape it from the host or through an SSH tunnel
+        server = await asyncio.start_server(self.handle_scrape, '127.0.0.1', port)
+        logger.info(f"Serving metrics on http://127.0.0.1:{port}/metrics")
+        return server
+
+metrics = Metrics()
+
+def blocking_section(name):
+    # Times a synchronous call (S3, DynamoDB, disk) wherever it runs, usually an executor thread
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.timed('blocking', name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def timed_handler(name, kind='handler'):
+    # Times a coroutine: dispatched sub-handlers, and component/modal callbacks (kind='component')
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with metrics.timed(kind, name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Interaction scheduling. Discord drops an interaction that is not answered within 3 seconds, so
+# slash commands are deferred up front when their recent latency says they would miss it, and the
+# handler's ctx.respond then goes out as a followup. Commands declared heavy (S3, DynamoDB, charts)
+# also run in a bounded lane, so a burst of them cannot crowd out the fast commands and the
+# onboarding components, which never wait on it.
+INTERACTION_DEADLINE_SECONDS = 3.0
+AUTO_DEFER_SECONDS = float(os.getenv("AUTO_DEFER_SECONDS", "1.5"))
+AUTO_DEFER_QUANTILE = 0.9
+AUTO_DEFER_MIN_SAMPLES = 5
+AUTO_DEFER_HISTORY = 50  # Recent runs per command used for the prediction
+HEAVY_LANE_CONCURRENCY = int(os.getenv("HEAVY_LANE_CONCURRENCY", "4"))
+
+@dataclass(frozen=True)
+class InteractionPolicy:
+    lane: str = 'fast'  # 'fast' or 'heavy'
+    ephemeral: bool = False  # Defer the same way the handler responds, so the followup matches
+    defer: bool = True  # False for handlers that answer with a modal or defer themselves
+
+# Undeclared commands keep their own timing: we don't know how they would want to be deferred
+UNDECLARED_POLICY = InteractionPolicy(defer=False)
+
+def interaction_lane(lane='fast', ephemeral=False, defer=True):
+    # Goes under @bot.slash_command; the scheduler reads it from the command's callback
+    def decorator(func):
+        func.__interaction_policy__ = InteractionPolicy(lane, ephemeral, defer)
+        return func
+    return decorator
+
+class InteractionScheduler:
+    def __init__(self, heavy_concurrency):
+        self.heavy_concurrency = heavy_concurrency
+        self.heavy = asyncio.Semaphore(heavy_concurrency)
+        self.heavy_waiting = 0
+        self.heavy_running = 0
+        self.history = defaultdict(lambda: deque(maxlen=AUTO_DEFER_HISTORY))  # command -> recent run times
+        self.deferred = 0
+        self.missed_deadline = 0  # Answered directly but only after the deadline; tune AUTO_DEFER_SECONDS if this grows
+
+    def predicted_seconds(self, name):
+        samples = sorted(self.history[name])
+        if len(samples) < AUTO_DEFER_MIN_SAMPLES:
+            return None
+        return samples[int(AUTO_DEFER_QUANTILE * (len(samples) - 1))]
+
+    def should_defer(self, name, policy):
+        if not policy.defer:
+            return False
+        if policy.lane == 'heavy' and self.heavy.locked():
+            return True  # It would queue behind other heavy commands first
+        predicted = self.predicted_seconds(name)
+        if predicted is None:
+            return policy.lane == 'heavy'  # Heavy commands are assumed slow until they show otherwise
+        return predicted > AUTO_DEFER_SECONDS
+
+    @contextlib.asynccontextmanager
+    async def slot(self, ctx):
+        name = ctx.command.qualified_name
+        policy = getattr(ctx.command.callback, '__interaction_policy__', UNDECLARED_POLICY)
+        deferred = self.should_defer(name, policy)
+        if deferred:
+            try:
+                await ctx.defer(ephemeral=policy.ephemeral)
+                self.deferred += 1
+            except discord.HTTPException as e:
+                logger.warning(f"Could not defer /{name}: {e}")
+
+        if policy.lane == 'heavy':
+            self.heavy_waiting += 1
+            try:
+                await self.heavy.acquire()
+            finally:
+                self.heavy_waiting -= 1
+            self.heavy_running += 1
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.history[name].append(elapsed)
+            if not deferred and policy.defer and elapsed > INTERACTION_DEADLINE_SECONDS:
+                self.missed_deadline += 1
+            if policy.lane == 'heavy':
+                self.heavy_running -= 1
+                self.heavy.release()
+
+    def stats(self):
+        return {
+            'heavy_limit': self.heavy_concurrency,
+            'heavy_running': self.heavy_running,
+            'heavy_waiting': self.heavy_waiting,
+            'deferred': self.deferred,
+            'missed_deadline': self.missed_deadline,
+        }
+
+interaction_scheduler = InteractionScheduler(HEAVY_LANE_CONCURRENCY)
+
+class PersistentViewBot(commands.AutoShardedBot if SHARD_COUNT else commands.Bot):
     def __init__(self):
         load_dotenv('.env')
         intents = discord.Intents.all()
-        super().__init__(command_prefix = '%%', intents=intents)
+        shard_options = {'shard_count': SHARD_COUNT, 'shard_ids': SHARD_IDS or None} if SHARD_COUNT else {}
+        # Commands are synced from on_ready, and only when they changed
+        super().__init__(command_prefix = '%%', intents=intents, auto_sync_commands=False, **shard_options)
         self.persistent_views_added = False
 
+    async def close(self):
+        await log_sink.close()
+        await speedup_log_sink.close()
+        chart_renderer.shutdown()
+        await super().close()
+        speedup_registry.close()
+        associations.close()
+        if shared_state is not None:
+            command_sync_lease.release()
+            gateway_lease.release()
+            shared_state.close()
+
+    async def start(self, *args, **kwargs):
+        # Renewals start before login and connect, so a slow startup can't let the gateway lease lapse
+        if shared_state is not None and not hasattr(self, '_gateway_lease_task'):
+            self._gateway_lease_task = asyncio.create_task(hold_gateway_lease(self))
+        await super().start(*args, **kwargs)
+
+    async def invoke_application_command(self, ctx):
+        async with interaction_scheduler.slot(ctx):
+            with metrics.timed('command', ctx.command.qualified_name):
+                await super().invoke_application_command(ctx)
+        # py-cord routes command errors to the error handlers instead of raising them
+        if getattr(ctx, 'command_failed', False):
+            metrics.record_error('command', ctx.command.qualified_name)
+
+    async def _run_event(self, coro, event_name, *args, **kwargs):
+        # Every gateway event handler and listener is timed under its event name, inside the
+        # error handling so failures are counted before on_error swallows them
+        async def timed_event(*args, **kwargs):
+            with metrics.timed('event', event_name):
+                await coro(*args, **kwargs)
+        await super()._run_event(timed_event, event_name, *args, **kwargs)
+
     async def on_ready(self):
         if not hasattr(self, '_synced'):
-            # Ensure commands are synced on the first ready event
-            await self.sync_commands()  # Synchronize slash commands with Discord
+            # Ensure commands are synced on the first ready event, unless Discord already has this exact set
+            # or another worker holds the command-sync lease
+            command_hash = command_set_hash(self)
+            if not await asyncio.get_running_loop().run_in_executor(None, command_sync_lease.try_acquire):
+                logger.info(f"Worker {command_sync_lease.holder} is syncing slash commands, skipping sync_commands")
+            elif command_hash != read_command_hash() or os.getenv("FORCE_COMMAND_SYNC", "0") == "1":
+                await self.sync_commands()  # Synchronize slash commands with Discord
+                write_command_hash(command_hash)
+            else:
+                logger.info("Slash commands unchanged since the last sync, skipping sync_commands")
             self._synced = True
         
-        global user_message_associations
-        try:
-            with open('user_message_associations.json', 'r') as f:
-                # Convert lists back to tuples after JSON deserialization
-                user_message_associations = [tuple(pair) for pair in json.load(f)]
-        except FileNotFoundError:
-            user_message_associations = []
+        if not hasattr(self, '_metrics_started'):
+            self._metrics_started = True
+            asyncio.create_task(metrics.watch_loop_lag())
+            if METRICS_PORT:
+                self._metrics_server = await metrics.serve(METRICS_PORT)
+
+        if hasattr(signal, 'SIGHUP') and not hasattr(self, '_config_reload_installed'):
+            # Re-read the environment on SIGHUP without restarting
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_config)
+            self._config_reload_installed = True
+
+        for guild in self.guilds:
+            guild_index.build(guild)
+
+        if BulkResetJob.load() is not None:
+            logger.warning("An interrupted bulk reset is waiting; run /bulk-resetaccess with resume to finish it")
+
+        if not associations.loaded:
+            associations.load()
+            asyncio.create_task(associations.run_maintenance())
+            if shared_state is not None:
+                asyncio.create_task(speedup_registry.follow())
+
+        # Catch the availability snapshot up with any schedule changes made while we were offline
+        asyncio.create_task(availability_matrix.catch_up_async())
+        asyncio.create_task(user_keys.prewarm_async())
 
         if not self.persistent_views_added:
-            self.add_view(InitialChoicesView())
-            self.add_view(UnlockView())
+            for view_class in PERSISTENT_VIEWS:
+                self.add_view(view_class())
 
             self.persistent_views_added = True
 
         await self.change_presence(activity=discord.Activity(type=discord.ActivityType.competing, name="an Epic SvS Battle"))
 
         print(f'Logged in as {bot.user} with an ID of {bot.user.id}')
+
+        if not hasattr(self, '_ready_logged'):
+            self._ready_logged = True
+            logger.info(f"Ready in {time.perf_counter() - PROCESS_STARTED:.2f}s (module import {IMPORT_SECONDS:.2f}s)")
+            if STARTUP_BENCHMARK:
+                await self.close()
             
 bot = PersistentViewBot()
 bot.remove_command('help')
@@ -66,43 +459,720 @@ bot.remove_command('help')
 
 
 
-LOGS_CHANNEL_ID = int(os.getenv("LOGS_CHANNEL_ID"))
-LEADERSHIP_ROLE_ID = int(os.getenv("LEADERSHIP_ROLE_ID"))
-BARRICADE_CHANNEL_ID = int(os.getenv("BARRICADE_CHANNEL_ID"))
 ALLIANCE_ID = 1157027714893631599
 
-def save_associations():
-    with open('user_message_associations.json', 'w') as f:
-        # Convert tuples in the list to lists for JSON serialization
-        json.dump([list(pair) for pair in user_message_associations], f)
+# Discord IDs the bot needs, read and validated once at startup (and again on SIGHUP)
+REQUIRED_ENV = {
+    'logs_channel_id': "LOGS_CHANNEL_ID",
+    'barricade_channel_id': "BARRICADE_CHANNEL_ID",
+    'leadership_role_id': "LEADERSHIP_ROLE_ID",
+    'general_alliance_role_id': "GENERAL_ALLIANCE_ROLE_ID",
+    'fel_alliance_role_id': "FEL_ALLIANCE_ROLE_ID",
+    'fel_academy_role_id': "FEL_ACADEMY_ROLE_ID",
+    'external_alliance_role_id': "EXTERNAL_ALLIANCE_ROLE_ID",
+    'external_state_role_id': "EXTERNAL_STATE_ROLE_ID",
+    'external_game_role_id': "EXTERNAL_GAME_ROLE_ID",
+}
+# IDs that used to be hard-coded; the environment can override them
+DEFAULT_ENV = {
+    'speedup_log_channel_id': ("SPEEDUP_LOG_CHANNEL_ID", 1222599205265080320),
+    'diplomacy_category_id': ("DIPLOMACY_CATEGORY_ID", 1158968530704793640),
+}
+
+@dataclass(frozen=True)
+class BotConfig:
+    logs_channel_id: int
+    barricade_channel_id: int
+    leadership_role_id: int
+    general_alliance_role_id: int
+    fel_alliance_role_id: int
+    fel_academy_role_id: int
+    external_alliance_role_id: int
+    external_state_role_id: int
+    external_game_role_id: int
+    speedup_log_channel_id: int
+    diplomacy_category_id: int
+    # Roles granted for each initial choice, and the roles that mean registration is complete
+    choice_role_ids: MappingProxyType = field(init=False)
+    registration_role_ids: frozenset = field(init=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'choice_role_ids', MappingProxyType({
+            "FEL": frozenset({self.general_alliance_role_id, self.fel_alliance_role_id}),
+            "FEL Academy": frozenset({self.general_alliance_role_id, self.fel_academy_role_id}),
+            "Another Alliance": frozenset({self.external_alliance_role_id}),
+            "Another State": frozenset({self.external_state_role_id}),
+            "Not Applicable": frozenset({self.external_game_role_id}),
+        }))
+        object.__setattr__(self, 'registration_role_ids', frozenset({
+            self.general_alliance_role_id,
+            self.external_alliance_role_id,
+            self.external_state_role_id,
+            self.external_game_role_id,
+        }))
+
+    @classmethod
+    def from_env(cls):
+        missing = [name for name in REQUIRED_ENV.values() if not os.getenv(name)]
+        if missing:
+            raise RuntimeError(f"Missing required environment variables: {', '.join(missing)}")
+        values = {}
+        for attribute, name in REQUIRED_ENV.items():
+            values[attribute] = os.getenv(name)
+        for attribute, (name, default) in DEFAULT_ENV.items():
+            values[attribute] = os.getenv(name, default)
+        for attribute, value in values.items():
+            try:
+                values[attribute] = int(value)
+            except ValueError:
+                raise RuntimeError(f"{attribute.upper()} must be a numeric Discord ID, got {value!r}")
+        return cls(**values)
+
+config = BotConfig.from_env()
+
+def reload_config():
+    global config
+    load_dotenv('.env', override=True)
+    try:
+        config = BotConfig.from_env()
+    except RuntimeError as e:
+        logger.error(f"Config reload failed, keeping the current configuration: {e}")
+        return
+    logger.info("Configuration reloaded")
+
+def leadership_only():
+    # Reads the role from the live config, so a reload also applies to permission checks
+    async def predicate(ctx):
+        if not isinstance(ctx.author, discord.Member) or ctx.author.get_role(config.leadership_role_id) is None:
+            raise commands.MissingRole(config.leadership_role_id)
+        return True
+    return commands.check(predicate)
+
+# Shared state backend. The default "local" backend keeps state in this process's files; with
+# STATE_BACKEND=sqlite every worker process shares STATE_DB (point them all at the same file),
+# which holds the barricade associations, the speedup registry and the leases used to elect
+# singleton workers. Each worker still needs its own working directory for its local caches
+STATE_BACKEND = os.getenv("STATE_BACKEND", "local")
+STATE_DB = os.getenv("STATE_DB", "state.db")
+STATE_POLL_SECONDS = float(os.getenv("STATE_POLL_SECONDS", "1"))
+LEASE_SECONDS = float(os.getenv("LEASE_SECONDS", "30"))
+
+class SharedState:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self.lock = threading.Lock()  # Serializes use of the connection across threads
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS associations (
+                message_id INTEGER NOT NULL,
+                member_id INTEGER NOT NULL,
+                PRIMARY KEY (message_id, member_id))""")
+            # Every change, in commit order, so each worker can apply what the others did
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS association_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                op TEXT NOT NULL,
+                message_id INTEGER NOT NULL,
+                member_id INTEGER NOT NULL,
+                worker TEXT NOT NULL)""")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+
+    def execute(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def transaction(self, func):
+        # func(conn) runs inside one write transaction
+        with self.lock, self.conn:
+            return func(self.conn)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+shared_state = SharedState(STATE_DB) if STATE_BACKEND == 'sqlite' else None
+
+class LeaderLease:
+    # A named lease in the shared state; whoever holds an unexpired lease runs the singleton task.
+    # Calling try_acquire again before it expires renews it. The local backend is always the leader
+    def __init__(self, state, name, ttl=LEASE_SECONDS):
+        self.state = state
+        self.name = name
+        self.ttl = ttl
+        self.holder = WORKER_ID if state is None else None
+        self.expires = 0.0  # Monotonic time our last successful claim runs out, measured from before the claim
+
+    @blocking_section("sqlite.lease")
+    def try_acquire(self):
+        if self.state is None:
+            return True
+        now, started = time.time(), time.monotonic()
+        def claim(conn):
+            conn.execute("""INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+                WHERE leases.holder = excluded.holder OR leases.expires_at < ?""", (self.name, WORKER_ID, now + self.ttl, now))
+            return conn.execute("SELECT holder FROM leases WHERE name = ?", (self.name,)).fetchone()[0]
+        self.holder = self.state.transaction(claim)
+        if self.holder == WORKER_ID:
+            self.expires = started + self.ttl
+        return self.holder == WORKER_ID
+
+    def release(self):
+        if self.state is not None and self.holder == WORKER_ID:
+            self.state.transaction(lambda conn: conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (self.name, WORKER_ID)))
+            self.holder = None
+
+command_sync_lease = LeaderLease(shared_state, 'sync_commands')
+# Only one worker may be connected for a given set of shards; a hot standby waits for this lease
+gateway_lease = LeaderLease(shared_state, f"gateway:{','.join(map(str, SHARD_IDS)) or 'all'}")
+
+def wait_for_gateway_lease():
+    while not gateway_lease.try_acquire():
+        logger.info(f"Standing by: worker {gateway_lease.holder} holds {gateway_lease.name}")
+        time.sleep(LEASE_SECONDS / 3)
+
+async def hold_gateway_lease(bot):
+    # Renew well inside the TTL; if another worker took over (e.g. we stalled), step down. If no
+    # renewal gets through before our claim runs out, a standby may take over, so step down too
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(LEASE_SECONDS / 3)
+        try:
+            held = await asyncio.wait_for(loop.run_in_executor(None, gateway_lease.try_acquire),
+                                          max(0.0, gateway_lease.expires - time.monotonic()))
+        except Exception as e:
+            logger.error(f"Failed to renew {gateway_lease.name}: {e!r}")
+            if time.monotonic() < gateway_lease.expires:
+                continue
+            logger.error(f"{gateway_lease.name} expired without a renewal, disconnecting")
+            await bot.close()
+            return
+        if not held:
+            logger.error(f"Lost {gateway_lease.name} to worker {gateway_lease.holder}, disconnecting")
+            await bot.close()
+            return
+
+# Barricade message <-> member associations, indexed both ways. Changes are appended to a journal
+# that is fsynced in batches and periodically compacted back into the JSON snapshot
+ASSOCIATIONS_FILE = 'user_message_associations.json'
+ASSOCIATIONS_JOURNAL = 'user_message_associations.journal'
+JOURNAL_FSYNC_SECONDS = float(os.getenv("JOURNAL_FSYNC_SECONDS", "0.5"))
+JOURNAL_COMPACT_ENTRIES = int(os.getenv("JOURNAL_COMPACT_ENTRIES", "1000"))
+
+class AssociationIndex:
+    def __init__(self, snapshot_path, journal_path):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.members_by_message = defaultdict(set)  # message_id -> member_ids (shared burst messages have many)
+        self.messages_by_member = defaultdict(set)  # member_id -> message_ids
+        self.pending = []  # (op, message_id, member_id) recorded on the event loop, not yet written
+        self.io_lock = asyncio.Lock()  # Orders journal writes and compactions; record() never waits on it
+        self.journal = None
+        self.journal_entries = 0
+        self.loaded = False
+
+    def load(self):
+        try:
+            with open(self.snapshot_path, 'r') as f:
+                for message_id, member_id in json.load(f):
+                    self.link(message_id, member_id)
+        except FileNotFoundError:
+            pass
+
+        # Replay anything journaled since the last compaction; a torn final line from a crash is ignored
+        try:
+            with open(self.journal_path, 'r') as f:
+                for line in f:
+                    try:
+                        op, message_id, member_id = json.loads(line)
+                    except ValueError:
+                        logger.warning("Ignoring a partial association journal entry")
+                        continue
+                    if op == '+':
+                        self.link(message_id, member_id)
+                    else:
+                        self.unlink(message_id, member_id)
+                    self.journal_entries += 1
+        except FileNotFoundError:
+            pass
+
+        self.journal = open(self.journal_path, 'a')
+        self.loaded = True
+        logger.info(f"Loaded {len(self.members_by_message)} barricade messages")
+
+    def link(self, message_id, member_id):
+        self.members_by_message[message_id].add(member_id)
+        self.messages_by_member[member_id].add(message_id)
+
+    def unlink(self, message_id, member_id):
+        if member_id not in self.members_by_message.get(message_id, ()):
+            return False
+        for index, key, value in ((self.members_by_message, message_id, member_id), (self.messages_by_member, member_id, message_id)):
+            index[key].discard(value)
+            if not index[key]:
+                del index[key]
+        return True
+
+    def record(self, op, pairs):
+        # Runs on the event loop with the index change; the write itself is batched by flush()
+        self.pending.extend((op, message_id, member_id) for message_id, member_id in pairs)
+        self.journal_entries += len(pairs)
+
+    def add(self, message_id, member_id):
+        self.add_many([(message_id, member_id)])
+
+    def add_many(self, pairs):
+        for message_id, member_id in pairs:
+            self.link(message_id, member_id)
+        self.record('+', pairs)
+
+    def remove(self, message_id, member_id=None):
+        # Drop one member from a message, or the whole message when no member is given
+        for member_id in ([member_id] if member_id is not None else self.members_for(message_id)):
+            if self.unlink(message_id, member_id):
+                self.record('-', [(message_id, member_id)])
+
+    def members_for(self, message_id):
+        return set(self.members_by_message.get(message_id, ()))
+
+    def messages_for(self, member_id):
+        return set(self.messages_by_member.get(member_id, ()))
+
+    def pairs(self):
+        return [[message_id, member_id] for message_id, member_ids in self.members_by_message.items() for member_id in member_ids]
+
+    @blocking_section("file.associations_sync")
+    def write(self, batch):
+        self.journal.write(''.join(json.dumps(list(entry)) + '\n' for entry in batch))
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+
+    @blocking_section("file.associations_compact")
+    def compact(self, pairs):
+        # Write a fresh snapshot, then start an empty journal. Replaying an old journal over the new
+        # snapshot is harmless, so a crash between the two steps loses nothing
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(pairs, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self.journal.close()
+        self.journal = open(self.journal_path, 'w')
+
+    async def flush(self):
+        # The batch is taken, and for a compaction the index copied, here on the event loop; the
+        # executor only ever sees those copies. A failed batch goes back in front of newer entries
+        loop = asyncio.get_running_loop()
+        async with self.io_lock:
+            batch, self.pending = self.pending, []
+            try:
+                if self.journal_entries >= JOURNAL_COMPACT_ENTRIES:
+                    await loop.run_in_executor(None, self.compact, self.pairs())
+                    self.journal_entries = len(self.pending)
+                elif batch:
+                    await loop.run_in_executor(None, self.write, batch)
+            except BaseException:
+                self.pending[:0] = batch
+                raise
+
+    async def run_maintenance(self):
+        while True:
+            await asyncio.sleep(JOURNAL_FSYNC_SECONDS)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to persist barricade associations: {e}")
+
+    def sync(self):
+        # Synchronous flush for shutdown, once the event loop has stopped
+        batch, self.pending = self.pending, []
+        if batch:
+            self.write(batch)
+
+    def close(self):
+        if self.loaded:
+            self.sync()
+            self.journal.close()
+
+class SharedAssociationIndex(AssociationIndex):
+    # The same in-memory index, persisted to the shared state instead of the local journal. Local
+    # changes are written in batches; changes from other workers are read back from the log in order
+    def __init__(self, state):
+        super().__init__(ASSOCIATIONS_FILE, ASSOCIATIONS_JOURNAL)
+        self.state = state
+        self.seen = 0  # Last association_log seq applied
+        self.trimmed = 0  # seq of the last log trim
+        self.trim_lease = LeaderLease(state, 'association_log_trim')
+
+    def load(self):
+        if not self.state.execute("SELECT 1 FROM meta WHERE name = 'associations_imported'"):
+            self.import_local_files()
+        self.replace(*self.read_all())
+        self.loaded = True
+        logger.info(f"Loaded {len(self.members_by_message)} barricade messages from the shared state")
+
+    def import_local_files(self):
+        # One-time move of this host's JSON snapshot and journal into the shared state
+        local = AssociationIndex(ASSOCIATIONS_FILE, ASSOCIATIONS_JOURNAL)
+        local.load()
+        local.close()
+        pairs = [(message_id, member_id) for message_id, member_ids in local.members_by_message.items() for member_id in member_ids]
+        def insert(conn):
+            conn.executemany("INSERT OR IGNORE INTO associations VALUES (?, ?)", pairs)
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('associations_imported', ?)", (datetime.utcnow().isoformat(),))
+        self.state.transaction(insert)
+
+    @blocking_section("sqlite.associations_reload")
+    def read_all(self):
+        def read(conn):
+            return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM association_log").fetchone()[0], conn.execute("SELECT message_id, member_id FROM associations").fetchall()
+        return self.state.transaction(read)
+
+    def replace(self, seen, pairs):
+        self.seen = self.trimmed = seen
+        self.members_by_message.clear()
+        self.messages_by_member.clear()
+        for message_id, member_id in pairs:
+            self.link(message_id, member_id)
+
+    @blocking_section("sqlite.associations_sync")
+    def write(self, batch):
+        def write(conn):
+            conn.executemany("INSERT OR IGNORE INTO associations VALUES (?, ?)", [(m, u) for op, m, u in batch if op == '+'])
+            conn.executemany("DELETE FROM associations WHERE message_id = ? AND member_id = ?", [(m, u) for op, m, u in batch if op == '-'])
+            conn.executemany("INSERT INTO association_log (op, message_id, member_id, worker) VALUES (?, ?, ?, ?)", [(op, m, u, WORKER_ID) for op, m, u in batch])
+        self.state.transaction(write)
+
+    @blocking_section("sqlite.associations_poll")
+    def fetch_changes(self):
+        # None means the log was trimmed past what we've seen, so the caller must reload everything
+        def read(conn):
+            first = conn.execute("SELECT MIN(seq) FROM association_log").fetchone()[0]
+            if first is not None and first > self.seen + 1:
+                return None
+            return conn.execute("SELECT seq, op, message_id, member_id, worker FROM association_log WHERE seq > ? ORDER BY seq", (self.seen,)).fetchall()
+        return self.state.transaction(read)
+
+    def apply_changes(self, changes):
+        for seq, op, message_id, member_id, worker in changes:
+            if worker != WORKER_ID:
+                if op == '+':
+                    self.link(message_id, member_id)
+                else:
+                    self.unlink(message_id, member_id)
+            self.seen = seq
+
+    @blocking_section("sqlite.associations_trim")
+    def trim(self):
+        # Keep a window of the log for workers that are briefly behind; anyone further back reloads
+        self.state.transaction(lambda conn: conn.execute("DELETE FROM association_log WHERE seq <= ?", (self.seen - JOURNAL_COMPACT_ENTRIES,)))
+
+    async def run_maintenance(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(min(JOURNAL_FSYNC_SECONDS, STATE_POLL_SECONDS))
+            try:
+                await self.flush()
+                # Database work happens in the executor; the index itself is only touched on the event loop
+                changes = await loop.run_in_executor(None, self.fetch_changes)
+                if changes is None:
+                    logger.warning("Fell behind the shared association log, reloading")
+                    self.replace(*await loop.run_in_executor(None, self.read_all))
+                else:
+                    self.apply_changes(changes)
+                if self.seen - self.trimmed >= JOURNAL_COMPACT_ENTRIES:
+                    self.trimmed = self.seen
+                    if await loop.run_in_executor(None, self.trim_lease.try_acquire):
+                        await loop.run_in_executor(None, self.trim)
+            except Exception as e:
+                logger.error(f"Failed to sync barricade associations with the shared state: {e}")
+
+    async def flush(self):
+        # Batches go out one at a time, so the log keeps this worker's changes in order
+        async with self.io_lock:
+            batch, self.pending = self.pending, []
+            if not batch:
+                return
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.write, batch)
+            except BaseException:
+                # Nothing was committed, so the whole batch goes back in front of newer changes
+                self.pending[:0] = batch
+                raise
+
+    def close(self):
+        if self.loaded:
+            self.sync()
+
+if shared_state is not None:
+    associations = SharedAssociationIndex(shared_state)
+else:
+    associations = AssociationIndex(ASSOCIATIONS_FILE, ASSOCIATIONS_JOURNAL)
+
+# Speedup registrations live in SQLite (WAL mode) with indexed lookups by member and by type/days.
+# Every connection use happens on the registry's single worker thread, so writes never race.
+SPEEDUP_TYPES = ["troops", "research", "construction"]
+REGISTRY_DB = os.getenv("REGISTRY_DB", STATE_DB if STATE_BACKEND == 'sqlite' else "registry.db")
+REGISTRY_BATCH_SECONDS = float(os.getenv("REGISTRY_BATCH_SECONDS", "0.05"))
+REGISTRY_POLL_OVERLAP_SECONDS = 5
+
+LEADERBOARD_PAGE_SIZE = 35
+
+class Leaderboard:
+    def __init__(self):
+        self.entries = []  # (-days, member_id), kept sorted so the top of the board is the front of the list
+        self.days = {}  # member_id -> days
+
+    def update(self, member_id, days):
+        if member_id in self.days:
+            del self.entries[bisect_left(self.entries, (-self.days[member_id], member_id))]
+        self.days[member_id] = days
+        insort(self.entries, (-days, member_id))
+
+    def page(self, page, size=LEADERBOARD_PAGE_SIZE):
+        return [(member_id, -negative_days) for negative_days, member_id in self.entries[page * size:(page + 1) * size]]
+
+    def page_count(self, size=LEADERBOARD_PAGE_SIZE):
+        return max(1, -(-len(self.entries) // size))
+
+class SpeedupRegistry:
+    def __init__(self, path):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='registry')
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS speedups (
+                member_id INTEGER NOT NULL,
+                speedup_type TEXT NOT NULL,
+                days INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (member_id, speedup_type))""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS speedups_by_type_days ON speedups (speedup_type, days DESC)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS speedups_by_updated_at ON speedups (updated_at)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self.pending = []  # (row, future) waiting for the next batched write
+        self.flush_task = None
+        self.import_json_registries()
+
+        # Leaderboards per type, plus a combined one ranking members by their total days
+        self.leaderboards = {speedup_type: Leaderboard() for speedup_type in SPEEDUP_TYPES + ["combined"]}
+        self.loaded_at = time.time()
+        for member_id, speedup_type, days in self.conn.execute("SELECT member_id, speedup_type, days FROM speedups"):
+            self.apply(member_id, speedup_type, days)
+
+    def import_json_registries(self):
+        # One-time import of the register-<type>.json files this store replaces
+        if self.conn.execute("SELECT 1 FROM meta WHERE name = 'json_imported'").fetchone():
+            return
+        rows = []
+        for speedup_type in SPEEDUP_TYPES:
+            filename = f"register-{speedup_type}.json"
+            if not os.path.exists(filename):
+                continue
+            with open(filename, "r") as file:
+                registry = json.load(file)
+            for member_id, days in registry.items():
+                try:
+                    rows.append((int(member_id), speedup_type, int(days), time.time()))
+                except ValueError:
+                    logger.warning(f"Skipping unreadable {speedup_type} registration for {member_id}: {days!r}")
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO speedups VALUES (?, ?, ?, ?)", rows)
+            self.conn.execute("INSERT INTO meta VALUES ('json_imported', ?)", (datetime.utcnow().isoformat(),))
+        logger.info(f"Imported {len(rows)} speedup registrations from JSON")
+
+    async def run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def set_days(self, member_id, speedup_type, days):
+        # Submissions are queued and written together, so a burst of modals costs one transaction
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append(((member_id, speedup_type, days, time.time()), future))
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self.flush())
+        await future
+
+    async def flush(self):
+        await asyncio.sleep(REGISTRY_BATCH_SECONDS)
+        batch, self.pending = self.pending, []
+        self.flush_task = None
+        try:
+            await self.run(self.write_rows, [row for row, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+        else:
+            for (member_id, speedup_type, days, _), future in batch:
+                self.apply(member_id, speedup_type, days)
+                future.set_result(None)
+
+    def apply(self, member_id, speedup_type, days):
+        self.leaderboards[speedup_type].update(member_id, days)
+        self.leaderboards["combined"].update(member_id, sum(self.leaderboards[t].days.get(member_id, 0) for t in SPEEDUP_TYPES))
+
+    @blocking_section("sqlite.write_registrations")
+    def write_rows(self, rows):
+        with self.conn:
+            self.conn.executemany("""INSERT INTO speedups (member_id, speedup_type, days, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (member_id, speedup_type) DO UPDATE SET days = excluded.days, updated_at = excluded.updated_at""", rows)
+
+    @blocking_section("sqlite.registry_poll")
+    def changes_since(self, since):
+        return self.conn.execute("SELECT member_id, speedup_type, days, updated_at FROM speedups WHERE updated_at > ?", (since,)).fetchall()
+
+    async def follow(self):
+        # With a shared database, pick up registrations written by other workers. The look-back
+        # overlap covers rows stamped just before a slow commit; re-reading them is harmless
+        since = self.loaded_at
+        while True:
+            await asyncio.sleep(STATE_POLL_SECONDS)
+            try:
+                rows = await self.run(self.changes_since, since - REGISTRY_POLL_OVERLAP_SECONDS)
+            except Exception as e:
+                logger.error(f"Failed to read registrations from the shared database: {e}")
+                continue
+            for member_id, speedup_type, days, updated_at in rows:
+                if self.leaderboards[speedup_type].days.get(member_id) != days:
+                    self.apply(member_id, speedup_type, days)
+                since = max(since, updated_at)
+
+    def member_speedups(self, member_id):
+        return {speedup_type: self.leaderboards[speedup_type].days[member_id] for speedup_type in SPEEDUP_TYPES if member_id in self.leaderboards[speedup_type].days}
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.conn.close()
+
+speedup_registry = SpeedupRegistry(REGISTRY_DB)
+
+# member_id -> display name, so leaderboard pages don't resolve every member on each view
+display_names = {}
+
+def display_name_for(guild, member_id):
+    if member_id not in display_names:
+        member = guild.get_member(member_id)  # Fetch the member object from the ID
+        if not member:
+            # If member not found (e.g., left the server), use a placeholder
+            return f"Member ID {member_id} (not found)"
+        display_names[member_id] = member.display_name
+    return display_names[member_id]
+
+# Roles and text channels indexed by name, kept current from guild events,
+# so diplomacy provisioning doesn't scan every role and channel on each submit
+class GuildIndex:
+    def __init__(self):
+        self.roles = {}  # (guild_id, name) -> role
+        self.channels = {}  # (guild_id, category_id, name) -> text channel
+        self.locks = defaultdict(asyncio.Lock)  # (guild_id, name) -> provisioning lock
+
+    def build(self, guild):
+        for role in guild.roles:
+            self.add_role(role)
+        for channel in guild.text_channels:
+            self.add_channel(channel)
+
+    def add_role(self, role):
+        self.roles[(role.guild.id, role.name)] = role
 
+    def remove_role(self, role):
+        key = (role.guild.id, role.name)
+        if key in self.roles and self.roles[key].id == role.id:
+            del self.roles[key]
+
+    def add_channel(self, channel):
+        if isinstance(channel, discord.TextChannel):
+            self.channels[(channel.guild.id, channel.category_id, channel.name)] = channel
+
+    def remove_channel(self, channel):
+        key = (channel.guild.id, getattr(channel, 'category_id', None), channel.name)
+        if key in self.channels and self.channels[key].id == channel.id:
+            del self.channels[key]
+
+    def role(self, guild_id, name):
+        return self.roles.get((guild_id, name))
+
+    def channel(self, guild_id, category_id, name):
+        return self.channels.get((guild_id, category_id, name))
+
+    def lock_for(self, guild_id, name):
+        return self.locks[(guild_id, name)]
+
+guild_index = GuildIndex()
+
+@bot.event
+async def on_guild_role_create(role):
+    guild_index.add_role(role)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    guild_index.remove_role(before)
+    guild_index.add_role(after)
+
+@bot.event
+async def on_guild_role_delete(role):
+    guild_index.remove_role(role)
+
+@bot.event
+async def on_guild_channel_create(channel):
+    guild_index.add_channel(channel)
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    guild_index.remove_channel(before)
+    guild_index.add_channel(after)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    guild_index.remove_channel(channel)
+
+# Persistent views are registered once in on_ready and handle clicks on every message by custom_id,
+# so any per-message state has to be encoded in the custom_id or the option values
+PERSISTENT_VIEWS = []
+
+def persistent_view(view_class):
+    PERSISTENT_VIEWS.append(view_class)
+    return view_class
+
+def view_template(view_class, *args, **kwargs):
+    # The copy sent with a message is built with store=False, so sending it never adds a per-message
+    # entry to the view store; clicks fall through to the registered instance by custom_id instead
+    return view_class(*args, store=False, **kwargs)
+
+@persistent_view
 class InitialChoicesView(discord.ui.View):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs, timeout=None)
         self.add_item(InitialChoicesSelect())
 
+@persistent_view
 class UnlockView(discord.ui.View):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs, timeout=None)
         self.add_item(UnlockButton())
 
+@persistent_view
 class RegisterSelectView(View):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs, timeout=None)
         self.add_item(RegisterSelect())
 
+@persistent_view
 class SpeedupTypeView(View):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.add_item(SpeedupTypeSelect())
+    def __init__(self, page=1, *args, **kwargs):
+        super().__init__(*args, **kwargs, timeout=None)
+        self.add_item(SpeedupTypeSelect(page=page))
 
 class RegisterSelect(Select):
     def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs, placeholder="Choose an option...", min_values=1, max_values=1)
+        super().__init__(*args, **kwargs, custom_id="register_select", placeholder="Choose an option...", min_values=1, max_values=1)
         self.add_option(label="Troops", description="Register your troops speedups")
         self.add_option(label="Research", description="Register your research speedups")
         self.add_option(label="Construction", description="Register your construction speedups")
     
+    @timed_handler("RegisterSelect", kind='component')
     async def callback(self, interaction: discord.Interaction):
         # Determine the speedup type based on the selected option
         speedup_type = self.values[0].lower()
@@ -112,15 +1182,19 @@ class RegisterSelect(Select):
         await interaction.response.send_modal(modal)
 
 class SpeedupTypeSelect(Select):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs, placeholder="Choose an option...", min_values=1, max_values=1)
-        self.add_option(label="Troops", description="View troops speedups")
-        self.add_option(label="Research", description="View research speedups")
-        self.add_option(label="Construction", description="View construction speedups")
+    def __init__(self, page=1, *args, **kwargs):
+        super().__init__(*args, **kwargs, custom_id="speedup_type_select", placeholder="Choose an option...", min_values=1, max_values=1)
+        # The requested page travels in the option value ("troops:2"), so one registered view serves every page
+        self.add_option(label="Troops", value=f"troops:{page}", description="View troops speedups")
+        self.add_option(label="Research", value=f"research:{page}", description="View research speedups")
+        self.add_option(label="Construction", value=f"construction:{page}", description="View construction speedups")
+        self.add_option(label="Combined", value=f"combined:{page}", description="View total speedups across all types")
     
+    @timed_handler("SpeedupTypeSelect", kind='component')
     async def callback(self, interaction: discord.Interaction):
         # Display the registration details based on the selected type
-        await display_registration_details(interaction, self.values[0])
+        speedup_type, page = self.values[0].split(':')
+        await display_registration_details(interaction, speedup_type, int(page))
 
 class InitialChoicesSelect(discord.ui.Select):
     def __init__(self, *args, **kwargs):
@@ -133,12 +1207,13 @@ class InitialChoicesSelect(discord.ui.Select):
         ]
         super().__init__(*args, options=options, custom_id="initial_choice_select", placeholder="Choose an option...", min_values=1, max_values=1, **kwargs)
 
+    @timed_handler("InitialChoicesSelect", kind='component')
     async def callback(self, interaction: discord.Interaction):
         choice = self.values[0]
         logger.info(f"Initial choice selected: {choice}")
         if choice == "Not Applicable":
-            not_applicable_role_id = int(os.getenv("EXTERNAL_GAME_ROLE_ID"))
-            role = interaction.guild.get_role(int(not_applicable_role_id))
+            not_applicable_role_id = config.external_game_role_id
+            role = interaction.guild.get_role(not_applicable_role_id)
             member = await interaction.guild.fetch_member(interaction.user.id)
             
             if role:
@@ -167,6 +1242,7 @@ class FollowUpModal(Modal):
 
         self.add_item(InputText(label="In-Game Name", placeholder="Your in-game name", custom_id="ingame_name", max_length=16))
 
+    @timed_handler("FollowUpModal", kind='component')
     async def callback(self, interaction: discord.Interaction):
         logger.info('Starting FollowUpModal callback')
         try:
@@ -195,33 +1271,38 @@ class FollowUpModal(Modal):
                 role_name_prefix = f"{state}-" if state else ""
                 role_name = f"diplo-{role_name_prefix}{alliance.lower()}".strip()
 
-                role = discord.utils.find(lambda r: r.name == role_name, guild.roles)
-                if not role and alliance:  # Ensure there's an alliance or state specified
-                    logger.info(f"Creating new role: {role_name}")
-                    role = await guild.create_role(name=role_name, reason="New alliance/state role created")
+                channel_name = role_name.lower()  # The channel name will be the same as the role name
+                category_id = config.diplomacy_category_id
+
+                # Only one submit per alliance can provision at a time, so the role and channel are created once
+                async with guild_index.lock_for(guild.id, role_name):
+                    role = guild_index.role(guild.id, role_name)
+                    if not role and alliance:  # Ensure there's an alliance or state specified
+                        logger.info(f"Creating new role: {role_name}")
+                        role = await guild.create_role(name=role_name, reason="New alliance/state role created")
+                        guild_index.add_role(role)
+
+                    category = guild.get_channel(category_id)
+
+                    overwrites = {
+                        guild.default_role: discord.PermissionOverwrite(read_messages=False, send_messages=False),  # Default role cannot access or send messages
+                        role: discord.PermissionOverwrite(read_messages=True, send_messages=True),  # New role can access and send messages
+                        guild.get_role(config.leadership_role_id): discord.PermissionOverwrite(read_messages=True, send_messages=True)  # Leadership can access and send messages
+                    }
+
+                    channel = guild_index.channel(guild.id, category_id, channel_name)
+
+                    channel_created = False
+                    # Check if the channel already exists or needs to be created
+                    if not channel and category:
+                        channel = await guild.create_text_channel(channel_name, category=category, overwrites=overwrites)
+                        guild_index.add_channel(channel)
+                        logger.info(f"Created new channel: {channel_name} under category {category.name}")
+                        channel_created = True
 
                 if role:
                     await member.add_roles(role)
                     logger.info(f"Role '{role_name}' has been added to {member.display_name}.")
-                
-                channel_name = role_name.lower()  # The channel name will be the same as the role name
-                category_id = 1158968530704793640
-                category = guild.get_channel(category_id)
-
-                overwrites = {
-                    guild.default_role: discord.PermissionOverwrite(read_messages=False, send_messages=False),  # Default role cannot access or send messages
-                    role: discord.PermissionOverwrite(read_messages=True, send_messages=True),  # New role can access and send messages
-                    guild.get_role(int(os.getenv("LEADERSHIP_ROLE_ID"))): discord.PermissionOverwrite(read_messages=True, send_messages=True)  # Leadership can access and send messages
-                }
-
-                channel = discord.utils.get(guild.text_channels, name=channel_name, category_id=category_id)
-
-                channel_created = False
-                # Check if the channel already exists or needs to be created
-                if not channel and category:
-                    channel = await guild.create_text_channel(channel_name, category=category, overwrites=overwrites)
-                    logger.info(f"Created new channel: {channel_name} under category {category.name}")
-                    channel_created = True
 
                 # Construct a welcome message
                 welcome_embed = Embed(color=discord.Colour.blue())  # Set embed color to blue
@@ -236,7 +1317,7 @@ class FollowUpModal(Modal):
                     welcome_embed.title = "Welcome!"
 
                 # Send the welcome message in the channel
-                await channel.send(embed=welcome_embed)
+                await send_rate_limited(channel, embed=welcome_embed)
 
             # Construct the new nickname based on the initial choice and provided details
             if self.initial_choice == "FEL":
@@ -258,27 +1339,12 @@ class FollowUpModal(Modal):
             logger.info(f"Nickname updated to '{new_nickname}' for {member.display_name}")
 
             # Role assignment logic here...
-            # Define role IDs for each choice
-            role_ids = {
-                "FEL": [int(os.getenv("GENERAL_ALLIANCE_ROLE_ID")), int(os.getenv("FEL_ALLIANCE_ROLE_ID"))],  # General and FEL role
-                "FEL Academy": [int(os.getenv("GENERAL_ALLIANCE_ROLE_ID")), int(os.getenv("FEL_ACADEMY_ROLE_ID"))],  # General and FeL Academy role
-                "Another Alliance": int(os.getenv("EXTERNAL_ALLIANCE_ROLE_ID")),
-                "Another State": int(os.getenv("EXTERNAL_STATE_ROLE_ID")),
-                "Not Applicable": int(os.getenv("EXTERNAL_GAME_ROLE_ID"))
-            }
-
             # Fetch and assign roles based on the initial choice
             roles_to_assign = []
-            if self.initial_choice in role_ids:
-                if isinstance(role_ids[self.initial_choice], list):
-                    for role_id in role_ids[self.initial_choice]:
-                        role = guild.get_role(int(role_id))
-                        if role:
-                            roles_to_assign.append(role)
-                else:
-                    role = guild.get_role(int(role_ids[self.initial_choice]))
-                    if role:
-                        roles_to_assign.append(role)
+            for role_id in config.choice_role_ids.get(self.initial_choice, ()):
+                role = guild.get_role(role_id)
+                if role:
+                    roles_to_assign.append(role)
             
             if roles_to_assign:
                 await member.add_roles(*roles_to_assign)
@@ -298,6 +1364,7 @@ class NameChangeModal(Modal):
         self.new_name = InputText(label="New In-Game Name", placeholder="Enter your new in-game name here...", max_length=16)
         self.add_item(self.new_name)
 
+    @timed_handler("NameChangeModal", kind='component')
     async def callback(self, interaction: discord.Interaction):
         try:
             print("On submit handler running")
@@ -322,57 +1389,39 @@ class DaysModal(Modal):
         self.speedup_type = speedup_type
         self.add_item(InputText(label="Number of Days", placeholder="Enter the number of days...", custom_id="days_input"))
     
+    @timed_handler("DaysModal", kind='component')
     async def callback(self, interaction):
         # Extract the number of days from the modal's input text
-        days = self.children[0].value
+        days = self.children[0].value.strip()
+        if not days.isdigit():
+            await interaction.response.send_message("Please enter the number of days as a whole number.", ephemeral=True)
+            return
+        days = int(days)
         
         # Update the registry with the new value
         await self.update_speedup_registry(interaction.user.id, days)
 
+        # Confirm before posting to the log channel, whose rate limiter can hold the send for a while
+        await interaction.response.send_message(f"You have registered {days} days for {self.speedup_type}.", ephemeral=True)
+
         # Prepare an embed message
         embed = Embed(description=f"{interaction.user.mention} registered {days} days of {self.speedup_type} speedups!", color=0x00ff00)  # Green color
 
-        # Send the embed message to the specific channel
-        channel_id = 1222599205265080320
-        channel = interaction.client.get_channel(channel_id)
-        if channel:
-            await channel.send(embed=embed)
-
-        # Send a confirmation message
-        await interaction.response.send_message(f"You have registered {days} days for {self.speedup_type}.", ephemeral=True)
+        # Batched into the speedup log channel with the same budget reserve as the audit log
+        speedup_log_sink.log(embed)
 
     async def update_speedup_registry(self, member_id, days):
-        # Define the filename based on the speedup type
-        filename = f"register-{self.speedup_type}.json"
-        # Check if the file exists, and load it; if not, initialize an empty dictionary
-        if os.path.exists(filename):
-            with open(filename, "r") as file:
-                registry = json.load(file)
-        else:
-            registry = {}
-
-        # Update the registry with the new days value for the member
-        registry[str(member_id)] = days
-
-        # Write the updated registry back to the file
-        with open(filename, "w") as file:
-            json.dump(registry, file)
+        await speedup_registry.set_days(member_id, self.speedup_type, days)
 
 class UnlockButton(discord.ui.Button):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, label="🔓 Unlock Access", style=discord.ButtonStyle.success, custom_id="unlock_access", **kwargs)
 
+    @timed_handler("UnlockButton", kind='component')
     async def callback(self, interaction: discord.Interaction):
-        # Find the member_id associated with this message_id
-        message_id = interaction.message.id
-        member_id = None
-        for m_id, mem_id in user_message_associations:
-            if m_id == message_id:
-                member_id = mem_id
-                break
-
-        if member_id and interaction.user.id == member_id:
-            view = InitialChoicesView()
+        # Check the member is one of those this welcome message was posted for
+        if interaction.user.id in associations.members_for(interaction.message.id):
+            view = view_template(InitialChoicesView)
             await interaction.response.send_message("Please choose an option:", view=view, ephemeral=True)
         else:
             await interaction.response.send_message("This button isn't for you!", ephemeral=True)
@@ -383,78 +1432,281 @@ class UnlockButton(discord.ui.Button):
 
 @bot.event
 async def on_member_update(before, after):
-    # Check if the update was a role addition
-    if len(before.roles) < len(after.roles):
-        new_role = next(role for role in after.roles if role not in before.roles)
-        # Define the role IDs that indicate registration completion
-        registration_role_ids = {
-            int(os.getenv("GENERAL_ALLIANCE_ROLE_ID")), 
-            int(os.getenv("EXTERNAL_ALLIANCE_ROLE_ID")),
-            int(os.getenv("EXTERNAL_STATE_ROLE_ID")),
-            int(os.getenv("EXTERNAL_GAME_ROLE_ID"))
-        }
-        
-        if new_role.id in registration_role_ids:
-            # Search through the list of tuples for a message ID associated with this member
-            associated_message_id = None
-            for message_id, member_id in user_message_associations:
-                if member_id == after.id:
-                    associated_message_id = message_id
-                    break  # Stop searching once we find a match
-            
-            if associated_message_id:
-                channel_id = BARRICADE_CHANNEL_ID
-                channel = bot.get_channel(channel_id)  # The channel where the welcome message was sent
-                try:
-                    # Attempt to delete the welcome message
-                    msg = await channel.fetch_message(associated_message_id)
-                    await msg.delete()
-                    logger.info(f"Deleted welcome message for {after.display_name}")
-                    # Remove the tuple from the list to clean up
-                    user_message_associations.remove((associated_message_id, after.id))
-                    save_associations()
-                except discord.NotFound:
-                    logger.info(f"Message already deleted for {after.display_name}")
-                except Exception as e:
-                    logger.error(f"Failed to delete welcome message for {after.display_name}: {e}")
-    
-    if before.nick != after.nick:
-        logs_channel = bot.get_channel(LOGS_CHANNEL_ID)
-        embed = discord.Embed(title="Nickname Change for:", description=f"{after}", color=0x3498db)
-        embed.add_field(name="Changed From:", value=before.nick if before.nick else "(None)", inline=False)
-        embed.add_field(name="Changed To:", value=after.nick if after.nick else "(None)", inline=False)
-        await logs_channel.send(embed=embed)
+    # Role diffs only matter for members still behind the barricade, which is an O(1) index check
+    if after.id in associations.messages_by_member:
+        added_role_ids = {role.id for role in after.roles} - {role.id for role in before.roles}
+        # Check a role was added that indicates registration completion
+        if not added_role_ids.isdisjoint(config.registration_role_ids):
+            await clear_barricade(after)
 
-@bot.event
-async def on_member_join(member):
-    logs_channel = bot.get_channel(LOGS_CHANNEL_ID)
-    embed = discord.Embed(title="SERVER JOIN", description=f"{member.display_name} ({member})", color=discord.Color.green())
-    await logs_channel.send(embed=embed)
+    if before.display_name != after.display_name:
+        display_names.pop(after.id, None)
 
-    channel_id = BARRICADE_CHANNEL_ID
-    channel = bot.get_channel(channel_id)
+    if before.nick != after.nick:
+        await log_nickname_change(before, after)
+
+@timed_handler("clear_barricade")
+async def clear_barricade(member):
+    # Look up any welcome messages still waiting on this member
+    for associated_message_id in associations.messages_for(member.id):
+        if len(associations.members_for(associated_message_id)) > 1:
+            # A shared burst message stays up until everyone on it has registered
+            associations.remove(associated_message_id, member.id)
+            continue
 
-    if channel:
+        channel_id = config.barricade_channel_id
+        channel = bot.get_channel(channel_id)  # The channel where the welcome message was sent
+        try:
+            # Attempt to delete the welcome message
+            msg = await channel.fetch_message(associated_message_id)
+            await msg.delete()
+            logger.info(f"Deleted welcome message for {member.display_name}")
+            # Remove the association to clean up
+            associations.remove(associated_message_id)
+        except discord.NotFound:
+            logger.info(f"Message already deleted for {member.display_name}")
+            associations.remove(associated_message_id)
+        except Exception as e:
+            logger.error(f"Failed to delete welcome message for {member.display_name}: {e}")
+
+@timed_handler("log_nickname_change")
+async def log_nickname_change(before, after):
+    embed = discord.Embed(title="Nickname Change for:", description=f"{after}", color=0x3498db)
+    embed.add_field(name="Changed From:", value=before.nick if before.nick else "(None)", inline=False)
+    embed.add_field(name="Changed To:", value=after.nick if after.nick else "(None)", inline=False)
+    log_sink.log(embed)
+
+# Joins are queued and handled in batches, so a join raid becomes a handful of summary
+# embeds and shared barricade messages instead of two sends per member
+JOIN_BATCH_SECONDS = float(os.getenv("JOIN_BATCH_SECONDS", "0.5"))
+JOIN_BURST_THRESHOLD = int(os.getenv("JOIN_BURST_THRESHOLD", "5"))
+SHARED_BARRICADE = os.getenv("SHARED_BARRICADE", "true").lower() == "true"
+MEMBERS_PER_BARRICADE_MESSAGE = 50
+
+class RateLimiter:
+    # Token bucket: at most `rate` sends every `per` seconds. Callers can ask to leave `reserve`
+    # tokens untouched, so low-priority traffic backs off before interactive traffic has to
+    def __init__(self, rate, per):
+        self.rate = rate
+        self.per = per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self.queues = defaultdict(deque)  # reserve -> futures of the callers waiting their turn
+
+    async def acquire(self, reserve=0):
+        # First come, first served among callers with the same reserve: only the head of each queue
+        # polls the bucket, and it hands over to the next caller once it has its token (or gives up)
+        queue = self.queues[reserve]
+        turn = asyncio.get_running_loop().create_future()
+        queue.append(turn)
+        try:
+            if queue[0] is not turn:
+                await turn
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+                self.updated = now
+                if self.tokens >= 1 + reserve:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 + reserve - self.tokens) * self.per / self.rate)
+        finally:
+            queue.remove(turn)
+            if queue and not queue[0].done():
+                queue[0].set_result(None)
+
+# Discord allows 5 messages per 5 seconds in a channel and about 50 requests a second overall
+channel_limiters = defaultdict(lambda: RateLimiter(5, 5))
+global_limiter = RateLimiter(45, 1)
+
+async def send_rate_limited(channel, reserve=0, **kwargs):
+    await channel_limiters[channel.id].acquire()
+    await global_limiter.acquire(reserve)
+    return await channel.send(**kwargs)
+
+def chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+async def post_barricade(channel, members):
+    # One welcome message per member, or shared messages for a burst of members
+    if SHARED_BARRICADE and len(members) >= JOIN_BURST_THRESHOLD:
+        groups = chunked(members, MEMBERS_PER_BARRICADE_MESSAGE)
+    else:
+        groups = [[member] for member in members]
+
+    pairs = []
+    for group in groups:
         # Creating the embed message
         embed = discord.Embed(title="Welcome to the Server!",
-                            description=f"{member.mention}, please select an option below to continue.",
+                            description=f"{', '.join(member.mention for member in group)}, please select an option below to continue.",
                             color=discord.Color.green())
         
         # Creating the view that holds your button
-        view = discord.ui.View()
-        view.add_item(UnlockButton())  # Assuming UnlockButton is your button class
+        view = view_template(UnlockView)
         
         # Sending the embed and button together
-        message = await channel.send(embed=embed, view=view)
-        # Store the message ID associated with the user
-        user_message_associations.append((message.id, member.id))
-        save_associations()
+        message = await send_rate_limited(channel, embed=embed, view=view)
+        pairs.extend((message.id, member.id) for member in group)
+
+    # Store the message ID associated with each user in one journal write
+    if pairs:
+        associations.add_many(pairs)
+
+# Audit and speedup log entries are buffered and sent as multi-embed messages every LOG_FLUSH_SECONDS.
+# Log sends leave LOG_RESERVE_TOKENS of the global budget for interactive responses
+LOG_FLUSH_SECONDS = float(os.getenv("LOG_FLUSH_SECONDS", "2"))
+LOG_QUEUE_LIMIT = int(os.getenv("LOG_QUEUE_LIMIT", "500"))
+LOG_RESERVE_TOKENS = int(os.getenv("LOG_RESERVE_TOKENS", "20"))
+EMBEDS_PER_MESSAGE = 10
+EMBED_CHARACTERS_PER_MESSAGE = 6000
+
+class LogSink:
+    def __init__(self, channel_setting):
+        self.channel_setting = channel_setting  # Config field with the channel ID, read at send time so reloads apply
+        self.buffer = deque()
+        self.task = None
+        self.events = 0
+        self.merged = 0
+        self.dropped = 0
+        self.messages = 0
+
+    def log(self, embed, events=1):
+        # `events` > 1 means the caller already merged several events into this embed
+        self.events += events
+        if len(self.buffer) >= LOG_QUEUE_LIMIT:
+            self.dropped += events
+            return
+        self.buffer.append(embed)
+        self.merged += events - 1
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while self.buffer:
+            await asyncio.sleep(LOG_FLUSH_SECONDS)
+            await self.flush()
+
+    def next_message(self):
+        # Up to 10 embeds per message, and no more than 6000 embed characters in total
+        embeds = [self.buffer[0]]
+        size = len(embeds[0])
+        for embed in itertools.islice(self.buffer, 1, EMBEDS_PER_MESSAGE):
+            if size + len(embed) > EMBED_CHARACTERS_PER_MESSAGE:
+                break
+            size += len(embed)
+            embeds.append(embed)
+        return embeds
+
+    async def flush(self, reserve=LOG_RESERVE_TOKENS):
+        channel = bot.get_channel(getattr(config, self.channel_setting))
+        while self.buffer:
+            # Entries stay buffered until their message is sent, so a shutdown mid-flush loses nothing
+            embeds = self.next_message()
+            try:
+                await send_rate_limited(channel, reserve=reserve, embeds=embeds)
+                self.messages += 1
+            except Exception as e:
+                self.dropped += len(embeds)
+                logger.error(f"Failed to send {len(embeds)} log entries: {e}")
+            for _ in embeds:
+                self.buffer.popleft()
+
+    async def close(self):
+        # Send whatever is still buffered; nothing else is competing for the budget at shutdown
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        await self.flush(reserve=0)
+
+    def stats(self):
+        return {
+            'queue_depth': len(self.buffer),
+            'events': self.events,
+            'merged': self.merged,
+            'dropped': self.dropped,
+            'messages': self.messages,
+        }
+
+log_sink = LogSink('logs_channel_id')
+speedup_log_sink = LogSink('speedup_log_channel_id')
+
+def join_log_embeds(members):
+    if len(members) == 1:
+        member = members[0]
+        return [discord.Embed(title="SERVER JOIN", description=f"{member.display_name} ({member})", color=discord.Color.green())]
+    # Embeds hold up to 25 fields
+    embeds = []
+    for group in chunked(members, 25):
+        embed = discord.Embed(title=f"SERVER JOIN ({len(members)} members)", color=discord.Color.green())
+        for member in group:
+            embed.add_field(name=member.display_name, value=str(member), inline=True)
+        embeds.append(embed)
+    return embeds
+
+class JoinPipeline:
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self.task = None
+        self.processed = 0
+        self.batches = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def submit(self, member):
+        self.queue.put_nowait((member, time.monotonic()))
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while True:
+            batch = [await self.queue.get()]
+            # Give the rest of a burst a moment to arrive, then take everything queued
+            await asyncio.sleep(JOIN_BATCH_SECONDS)
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self.process([member for member, _ in batch])
+            except Exception as e:
+                logger.error(f"Failed to process {len(batch)} joins: {e}", exc_info=True)
+
+            finished = time.monotonic()
+            for _, queued_at in batch:
+                self.total_latency += finished - queued_at
+                self.max_latency = max(self.max_latency, finished - queued_at)
+            self.processed += len(batch)
+            self.batches += 1
+
+    async def process(self, members):
+        for embed in join_log_embeds(members):
+            log_sink.log(embed, events=len(embed.fields) or 1)
+
+        channel = bot.get_channel(config.barricade_channel_id)
+        if channel:
+            await post_barricade(channel, members)
+
+    def stats(self):
+        return {
+            'queued': self.queue.qsize(),
+            'processed': self.processed,
+            'batches': self.batches,
+            'avg_latency_s': round(self.total_latency / self.processed, 3) if self.processed else 0.0,
+            'max_latency_s': round(self.max_latency, 3),
+        }
+
+join_pipeline = JoinPipeline()
+
+@bot.event
+async def on_member_join(member):
+    join_pipeline.submit(member)
 
 @bot.event
 async def on_member_remove(member):
+    display_names.pop(member.id, None)
     embed = discord.Embed(title="SERVER LEAVE", description=f"{member.display_name} has left the server.", color=discord.Color.red())
-    logs_channel = bot.get_channel(LOGS_CHANNEL_ID)
-    await logs_channel.send(embed=embed)
+    log_sink.log(embed)
 
 
 @bot.command(description="Sends the bot's latency.") # this decorator makes a slash command
@@ -462,95 +1714,187 @@ async def ping(ctx): # a slash command will be created with the name "ping"
     await ctx.respond(f"Pong! Latency is {bot.latency}")
 
 @bot.slash_command(guild_ids=[ALLIANCE_ID], name="resetaccess", description="Reset access for a member.")
-@commands.has_role(LEADERSHIP_ROLE_ID)  # Ensure only members with the specific role can use this command
+@interaction_lane(ephemeral=True)
+@leadership_only()  # Ensure only members with the leadership role can use this command
 async def resetaccess(ctx: discord.ApplicationContext, member: discord.Member):
     # Clear all roles and nickname
     await member.edit(nick=None, roles=[])
     await ctx.respond(f"Access for {member.display_name} has been reset.", ephemeral=True)
     
     # Send a message to the barricade channel
-    channel = bot.get_channel(BARRICADE_CHANNEL_ID)
+    channel = bot.get_channel(config.barricade_channel_id)
     if channel:
-        embed = discord.Embed(title="Welcome to the Server!",
-                              description=f"{member.mention}, please select an option below to continue.",
-                              color=discord.Color.green())
-        view = discord.ui.View()
-        view.add_item(UnlockButton())  # Ensure your UnlockButton is defined
-        
-        message = await channel.send(embed=embed, view=view)
-        user_message_associations.append((message.id, member.id))
-        save_associations()
+        await post_barricade(channel, [member])
     else:
         await ctx.respond("Failed to find the barricade channel.", ephemeral=True)
     
+# Bulk resets run through a small worker pool and checkpoint their progress, so a crash
+# halfway through can be resumed instead of leaving members reset without a barricade message
+BULK_RESET_CHECKPOINT = 'bulk-reset-checkpoint.json'
+BULK_RESET_CONCURRENCY = int(os.getenv("BULK_RESET_CONCURRENCY", "4"))
+BULK_RESET_PROGRESS_SECONDS = 5
+bulk_reset_lock = asyncio.Lock()
+
+class BulkResetJob:
+    def __init__(self, guild_id, pending, reset=(), failed=(), barricade_posted=False):
+        self.guild_id = guild_id
+        self.pending = set(pending)  # Members still to be reset
+        self.reset = set(reset)  # Reset, waiting for their barricade message
+        self.failed = set(failed)
+        self.barricade_posted = barricade_posted  # Set before the welcome messages go out, so a resume never repeats them
+
+    @classmethod
+    def load(cls):
+        try:
+            with open(BULK_RESET_CHECKPOINT, 'r') as f:
+                return cls(**json.load(f))
+        except FileNotFoundError:
+            return None
+
+    @blocking_section("file.bulk_reset_checkpoint")
+    def save(self):
+        state = {'guild_id': self.guild_id, 'pending': sorted(self.pending), 'reset': sorted(self.reset), 'failed': sorted(self.failed),
+                 'barricade_posted': self.barricade_posted}
+        tmp_path = f"{BULK_RESET_CHECKPOINT}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, BULK_RESET_CHECKPOINT)
+
+    def clear(self):
+        if os.path.exists(BULK_RESET_CHECKPOINT):
+            os.remove(BULK_RESET_CHECKPOINT)
+
+    def progress(self):
+        total = len(self.pending) + len(self.reset) + len(self.failed)
+        return f"Reset {len(self.reset)}/{total} members ({len(self.failed)} failed, {len(self.pending)} remaining)."
+
+async def run_bulk_reset(ctx, job):
+    guild = ctx.guild
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(BULK_RESET_CONCURRENCY)
+
+    async def reset_member(member_id):
+        async with semaphore:
+            member = guild.get_member(member_id)
+            try:
+                if member is None:
+                    raise LookupError("member is no longer in the server")
+                # Edits leave headroom in the global budget for interactive traffic
+                await global_limiter.acquire(LOG_RESERVE_TOKENS)
+                # Clear all roles and nickname
+                await member.edit(nick=None, roles=[])
+                job.reset.add(member_id)
+            except Exception as e:
+                logger.error(f"Bulk reset failed for member {member_id}: {e}")
+                job.failed.add(member_id)
+            job.pending.discard(member_id)
+
+    async def report_progress():
+        while True:
+            await asyncio.sleep(BULK_RESET_PROGRESS_SECONDS)
+            await loop.run_in_executor(None, job.save)
+            await ctx.interaction.edit_original_response(content=job.progress())
+
+    await loop.run_in_executor(None, job.save)
+    reporter = asyncio.create_task(report_progress())
+    try:
+        await asyncio.gather(*(reset_member(member_id) for member_id in list(job.pending)))
+    finally:
+        reporter.cancel()
+    await loop.run_in_executor(None, job.save)
+
+    if job.barricade_posted:
+        # Interrupted after the welcome messages started going out; sending them again would duplicate them
+        await loop.run_in_executor(None, job.clear)
+        await ctx.interaction.edit_original_response(content=f"Done. {job.progress()} The barricade messages were already posted before the interruption.")
+        return
+
+    # Reuse the barricade pipeline: burst-sized resets share welcome messages
+    channel = bot.get_channel(config.barricade_channel_id)
+    if channel is None:
+        await ctx.interaction.edit_original_response(content=f"{job.progress()} Failed to find the barricade channel, run with resume to retry.")
+        return
+    job.barricade_posted = True
+    await loop.run_in_executor(None, job.save)
+    await post_barricade(channel, [member for member in map(guild.get_member, sorted(job.reset)) if member])
+    await associations.flush()
+    await loop.run_in_executor(None, job.clear)
+    await ctx.interaction.edit_original_response(content=f"Done. {job.progress()}")
+
+@bot.slash_command(guild_ids=[ALLIANCE_ID], name="bulk-resetaccess", description="Reset access for every member of a role or a list of members.")
+@interaction_lane(defer=False)  # Defers itself once its arguments check out
+@leadership_only()  # Ensure only members with the leadership role can use this command
+async def bulk_resetaccess(ctx: discord.ApplicationContext,
+                           role: Option(discord.Role, required=False, description="Reset everyone with this role"),
+                           members: Option(str, required=False, description="Member mentions or IDs, separated by spaces"),
+                           resume: Option(bool, required=False, default=False, description="Resume an interrupted bulk reset")):
+    if bulk_reset_lock.locked():
+        await ctx.respond("A bulk reset is already running.", ephemeral=True)
+        return
+
+    async with bulk_reset_lock:
+        if resume:
+            job = BulkResetJob.load()
+            if job is None or job.guild_id != ctx.guild.id:
+                await ctx.respond("There is no interrupted bulk reset to resume.", ephemeral=True)
+                return
+        else:
+            if BulkResetJob.load() is not None:
+                await ctx.respond("An interrupted bulk reset is waiting; run with resume first.", ephemeral=True)
+                return
+            member_ids = {member.id for member in role.members} if role else set()
+            member_ids.update(int(member_id) for member_id in re.findall(r"\d{15,20}", members or ""))
+            if not member_ids:
+                await ctx.respond("Give a role or at least one member to reset.", ephemeral=True)
+                return
+            job = BulkResetJob(ctx.guild.id, member_ids)
+
+        await ctx.defer(ephemeral=True)
+        await ctx.interaction.edit_original_response(content=job.progress())
+        await run_bulk_reset(ctx, job)
+
 @bot.slash_command(guild_ids=[ALLIANCE_ID], name="changename", description="Change your in-game name")
+@interaction_lane(defer=False)  # Answers with a modal, which a deferred interaction can't open
 async def changename(ctx):
     modal = NameChangeModal(title="Change Your Name By Filling Out Below")
     await ctx.response.send_modal(modal)
 
 @bot.slash_command(guild_ids=[ALLIANCE_ID], name="register", description="Register your days of speedups")
+@interaction_lane(ephemeral=True)
 async def register(ctx):
     # Create a view to hold the select menu
-    view = RegisterSelectView()
+    view = view_template(RegisterSelectView)
     await ctx.respond("Please select an option:", view=view, ephemeral=True)
 
 @bot.slash_command(guild_ids=[ALLIANCE_ID], name="registration", description="View speedup registration details")
-async def registration(ctx, member: Option(Member, required=False, description="Select a member")):
+@interaction_lane()
+async def registration(ctx, member: Option(Member, required=False, description="Select a member"),
+                       page: Option(int, required=False, min_value=1, default=1, description="Leaderboard page")):
     # If a member is specified, show their details directly
     if member:
         await show_member_speedups(ctx, member)
     else:
         # Otherwise, present a select menu to choose the speedup type
-        view = SpeedupTypeView()
+        view = view_template(SpeedupTypeView, page=page)
         await ctx.respond("Select the type of speedups to view:", view=view, ephemeral=False)
 
-async def display_registration_details(interaction, speedup_type):
-    filename = f"register-{speedup_type.lower()}.json"
+async def display_registration_details(interaction, speedup_type, page=1):
     guild = interaction.guild  # The guild (server) from the interaction
+    leaderboard = speedup_registry.leaderboards[speedup_type.lower()]
     
-    try:
-        with open(filename, "r") as file:
-            registry = json.load(file)
-    except FileNotFoundError:
+    # The leaderboard is kept sorted, so a page is a slice
+    page = min(page, leaderboard.page_count())
+    entries = leaderboard.page(page - 1)
+    if not entries:
         await interaction.response.send_message(f"No registrations found for {speedup_type}.", ephemeral=False)
         return
     
-    member_info_list = []
-    for member_id, days in registry.items():
-        member = guild.get_member(int(member_id))  # Fetch the member object from the ID
-        if member:
-            # If member is found, use their display name
-            member_name = member.display_name
-        else:
-            # If member not found (e.g., left the server), use a placeholder
-            member_name = f"Member ID {member_id} (not found)"
-        member_info_list.append((member_name, days))
-    
-    # Sort the list by days (descending) and take top 35
-    sorted_member_info_list = sorted(member_info_list, key=lambda x: int(x[1]), reverse=True)[:35]
-    formatted_list = "\n".join([f"{idx + 1}. {member_name}: {days} days" for idx, (member_name, days) in enumerate(sorted_member_info_list)])
-    
-    if formatted_list:
-        await interaction.response.send_message(f"```{formatted_list}```", ephemeral=False)
-    else:
-        await interaction.followup.send("No registrations found.", ephemeral=False)
+    first_rank = (page - 1) * LEADERBOARD_PAGE_SIZE + 1
+    formatted_list = "\n".join([f"{rank}. {display_name_for(guild, member_id)}: {days} days" for rank, (member_id, days) in enumerate(entries, start=first_rank)])
+    await interaction.response.send_message(f"{speedup_type.capitalize()} (page {page}/{leaderboard.page_count()})\n```{formatted_list}```", ephemeral=False)
 
 async def show_member_speedups(ctx, member):
-    speedup_types = ["troops", "research", "construction"]
-    member_speedups = {}
-
-    # Iterate through each type of speedup and try to find the member's data
-    for speedup_type in speedup_types:
-        filename = f"register-{speedup_type}.json"
-        try:
-            with open(filename, "r") as file:
-                registry = json.load(file)
-                # If the member's ID is in the registry, add it to the member_speedups dictionary
-                if str(member.id) in registry:
-                    member_speedups[speedup_type] = registry[str(member.id)]
-        except FileNotFoundError:
-            # If the file doesn't exist, just skip it
-            continue
+    member_speedups = speedup_registry.member_speedups(member.id)
 
     if member_speedups:
         # Construct the message if there are speedups registered for the member
@@ -562,105 +1906,366 @@ async def show_member_speedups(ctx, member):
 
     await ctx.respond(message, ephemeral=False)
 
-def load_files_from_s3(subfolder):
-    files = []
-    response = s3.list_objects_v2(Bucket=bucket_name, Prefix=subfolder)
-    for item in response.get('Contents', []):
-        key = item['Key']
-        # Check that the object is not a directory by ensuring it doesn't end with '/'
-        if not key.endswith('/'):
-            file_content = s3.get_object(Bucket=bucket_name, Key=key)
-            file_data = file_content['Body'].read().decode('utf-8')
-            
+# S3 key -> (ETag, parsed JSON), so unchanged objects are never downloaded twice
+s3_object_cache = {}
+# One sync at a time per prefix; a second caller just waits and reuses the fresh cache
+s3_sync_locks = defaultdict(threading.Lock)
+# Prefix -> callbacks told about every (changed, removed) batch, in sync order
+s3_sync_listeners = defaultdict(list)
+
+@blocking_section("s3.list_objects")
+def list_s3_objects(subfolder):
+    # Page through every key under the prefix (list_objects_v2 stops at 1000 per call)
+    objects = []
+    paginator = s3_client().get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=subfolder):
+        for item in page.get('Contents', []):
+            key = item['Key']
+            # Check that the object is not a directory by ensuring it doesn't end with '/'
+            if not key.endswith('/'):
+                objects.append((key, item['ETag']))
+    return objects
+
+@blocking_section("s3.get_object")
+def fetch_s3_object(key, etag):
+    file_content = s3_client().get_object(Bucket=bucket_name, Key=key)
+    file_data = file_content['Body'].read().decode('utf-8')
+
+    try:
+        json_data = json.loads(file_data)
+    except json.JSONDecodeError as e:
+        logging.error(f"Failed to decode JSON from {key}: {e}")
+        json_data = None
+    # Prefer the ETag of the body we actually read, in case it changed since the listing
+    return key, file_content.get('ETag', etag), json_data
+
+def fetch_s3_objects(objects):
+    # Download the given (key, etag) pairs concurrently on the bounded S3 pool
+    return list(s3_executor.map(lambda obj: fetch_s3_object(*obj), objects))
+
+MALFORMED_DOCUMENT_ERRORS = (AttributeError, KeyError, TypeError, ValueError)
+
+def parse_documents(parse, documents):
+    # `parse` takes a whole {key: document} batch. When a malformed document makes it fail, every
+    # document is tried alone and the ones that fail are logged and left out of the batch
+    try:
+        return documents, parse(documents)
+    except MALFORMED_DOCUMENT_ERRORS:
+        valid = {}
+        for key, document in documents.items():
             try:
-                json_data = json.loads(file_data)
-                files.append(json_data)
-            except json.JSONDecodeError as e:
-                logging.error(f"Failed to decode JSON from {key}: {e}")
-                # Optionally, continue to the next item or handle the error as needed
+                parse({key: document})
+                valid[key] = document
+            except MALFORMED_DOCUMENT_ERRORS as e:
+                logger.warning(f"Skipping malformed S3 document {key}: {e!r}")
+        return valid, parse(valid)
+
+def sync_s3_prefix(subfolder):
+    with s3_sync_locks[subfolder]:
+        objects = list_s3_objects(subfolder)
+        stale = [(key, etag) for key, etag in objects if s3_object_cache.get(key, (None, None))[0] != etag]
+        fetched = fetch_s3_objects(stale)
+        changed = {key: json_data for key, _, json_data in fetched}
+        live_keys = {key for key, _ in objects}
+        removed = [key for key in list(s3_object_cache) if key.startswith(subfolder) and key not in live_keys]
+
+        # Listeners see the changes before the cache does: if one fails, the cache still holds the
+        # old ETags and the next sync hands the same objects over again
+        if changed or removed:
+            for listener in s3_sync_listeners[subfolder]:
+                listener(changed, removed)
+        for key, etag, json_data in fetched:
+            s3_object_cache[key] = (etag, json_data)
+        # Forget objects that have been deleted from the bucket
+        for key in removed:
+            del s3_object_cache[key]
+
+        files = [s3_object_cache[key][1] for key, _ in objects if s3_object_cache[key][1] is not None]
+
+    if changed or removed:
+        logger.info(f"S3 sync of {subfolder}: {len(objects)} objects, {len(changed)} downloaded, {len(removed)} removed")
+    return files, changed, removed
+
+def load_files_from_s3(subfolder):
+    files, _, _ = sync_s3_prefix(subfolder)
     return files
 
-def load_schedules():
-    return load_files_from_s3('schedules/')
-
-def load_absences():
-    return load_files_from_s3('absences/')
-
-def extract_day_availability(schedules, day):
-    day_availability = {}
-    for schedule in schedules:
-        username = schedule['username']
-        times = schedule['schedule'][day]
-        day_availability[username] = times
-    return day_availability
-
-def adjust_availability_for_absences(day_availability, absences, date):
-    print(f"DEBUG DATE: {date}")
-    date_str = date.strftime('%m/%d')  # Format the date as MM/DD for comparison
-    logging.debug(f"Adjusting availabilities for date: {date_str}")
-
-    print(f"DEBUG DATE STR: {date_str}")
-
-    for absence in absences:
-        username = absence['username']
-        print(f"DEBUG ABSENCE ABS: {absence['absences']}")
-        if date_str in absence['absences']:
-            user_absences = absence['absences'][date_str]
-            logging.info(f"Processing absences for {username}: {user_absences}")
-
-            if username in day_availability:
-                new_periods = []
-                for scheduled_time in day_availability[username]:
-                    schedule_start = datetime.strptime(scheduled_time[0], '%H:%M')
-                    schedule_end = datetime.strptime(scheduled_time[1], '%H:%M')
-                    periods_to_add = [(schedule_start, schedule_end)]
-
-                    for absence_time in user_absences:
-                        absence_start = datetime.strptime(absence_time[0], '%H:%M')
-                        absence_end = datetime.strptime(absence_time[1], '%H:%M')
-                        updated_periods = []
-
-                        for start, end in periods_to_add:
-                            if start < absence_end and end > absence_start:
-                                if start < absence_start:
-                                    updated_periods.append((start, min(end, absence_start)))
-                                if end > absence_end:
-                                    updated_periods.append((max(start, absence_end), end))
-                            else:
-                                updated_periods.append((start, end))
-                        periods_to_add = updated_periods
-
-                    new_periods.extend([(start.strftime('%H:%M'), end.strftime('%H:%M')) for start, end in periods_to_add])
-                    logging.info(f"New periods for {username} after processing absence: {new_periods}")
-
-                day_availability[username] = new_periods
-                logging.info(f"Final availability for {username}: {day_availability[username]}")
-            else:
-                logging.info(f"No scheduled availability to adjust for {username}")
-        else:
-            logging.info(f"No absences recorded on {date_str} for {username}")
+async def load_files_from_s3_async(subfolder):
+    # Listing and downloading are blocking boto3 calls, so keep them off the event loop
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, load_files_from_s3, subfolder)
+
+async def load_absences_async():
+    return await load_files_from_s3_async('absences/')
 
-def visualize_availability(day_availability):
-    # Define the total minutes in a day
+# Schedules are parsed by the interval engine in intervals.py. The constant is repeated here
+# so the module-level definitions below don't load it (and numpy) at import time
+MINUTES_PER_DAY = 24 * 60
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+# Absences indexed by date, then by S3 object, with the periods already parsed to minutes.
+# The index follows the absences/ prefix through sync_s3_prefix, so only changed objects are re-parsed
+class AbsenceIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cuts = defaultdict(dict)  # "MM/DD" -> S3 key -> (username, starts, ends) on that date
+        self.spills = defaultdict(dict)  # "MM/DD" -> S3 key -> (username, ends) running past midnight into the next date
+        self.dates = {}  # S3 key -> dates it is indexed under
+
+    @staticmethod
+    def parse(documents):
+        entries = [(key, absence['username'], date_str, periods)
+                   for key, absence in documents.items()
+                   for date_str, periods in absence.get('absences', {}).items()]
+        return entries, intervals.parse_period_lists([periods for _, _, _, periods in entries])
+
+    def update(self, changed, removed):
+        # Parse every changed document's periods in one batch before taking the lock. A malformed
+        # document is left out, and is dropped from the index below as if it had been deleted
+        documents = {key: absence for key, absence in changed.items() if absence is not None}
+        _, (entries, (owners, starts, ends, spill_ends)) = parse_documents(self.parse, documents)
+        bounds = np.searchsorted(owners, np.arange(len(entries) + 1)).tolist()
+
+        with self.lock:
+            for key in itertools.chain(removed, changed):
+                for date_str in self.dates.pop(key, ()):
+                    self.cuts[date_str].pop(key, None)
+                    self.spills[date_str].pop(key, None)
+            for index, (key, username, date_str, _) in enumerate(entries):
+                period = slice(bounds[index], bounds[index + 1])
+                self.cuts[date_str][key] = (username, starts[period], ends[period])
+                spill = spill_ends[period]
+                if spill.any():
+                    self.spills[date_str][key] = (username, spill[spill > 0])
+                self.dates.setdefault(key, []).append(date_str)
+
+    def masks(self, date, usernames):
+        # Minute masks of everything each user is absent for on this date, one row per absent user
+        date_str = date.strftime('%m/%d')  # Format the date as MM/DD for comparison
+        previous_date_str = (date - timedelta(days=1)).strftime('%m/%d')
+
+        # Only the users absent on this date (or overnight from the previous one) are touched
+        with self.lock:
+            cuts = [entry for entry in self.cuts.get(date_str, {}).values() if entry[0] in usernames]
+            spills = [entry for entry in self.spills.get(previous_date_str, {}).values() if entry[0] in usernames]
+        rows = {}
+        for username, *_ in itertools.chain(cuts, spills):
+            rows.setdefault(username, len(rows))
+        if not rows:
+            return [], np.zeros((0, MINUTES_PER_DAY), dtype=bool)
+
+        cut_owners = np.repeat([rows[username] for username, _, _ in cuts] + [rows[username] for username, _ in spills],
+                               [len(starts) for _, starts, _ in cuts] + [len(ends) for _, ends in spills]).astype(np.int64)
+        cut_starts, cut_ends = intervals.join_intervals(*[(starts, ends) for _, starts, ends in cuts],
+                                              *[(np.zeros_like(ends), ends) for _, ends in spills])
+        return list(rows), intervals.minute_masks(cut_owners, cut_starts, cut_ends, len(rows))
+
+    def range_masks(self, start_date, days, usernames):
+        # One (date, absent usernames, masks) entry per date, e.g. for a week view
+        return [(date, *self.masks(date, usernames)) for date in (start_date + timedelta(days=offset) for offset in range(days))]
+
+absence_index = AbsenceIndex()
+s3_sync_listeners['absences/'].append(absence_index.update)
+
+async def refresh_absences_async():
+    # Syncing the prefix feeds any changed absence documents into the index
+    await load_absences_async()
+
+# Weekly availability matrix: one bit-packed row of 7 x 1440 minutes per schedule object,
+# kept in a memory-mapped snapshot so a restart doesn't need a full S3 rescan
+WEEK_MINUTES = 7 * MINUTES_PER_DAY
+AVAILABILITY_MATRIX_FILE = 'availability-matrix.npy'
+AVAILABILITY_INDEX_FILE = 'availability-matrix.json'
+AVAILABILITY_REFRESH_SECONDS = float(os.getenv("AVAILABILITY_REFRESH_SECONDS", "30"))
+
+def week_masks(schedules):
+    # Parse every day of every schedule at once; overnight periods spill into the next day (Sunday wraps to Monday)
+    period_lists = [schedule['schedule'].get(day, []) for schedule in schedules for day in WEEKDAYS]
+    owners, starts, ends, spill_ends = intervals.parse_period_lists(period_lists)
+    users, days = np.divmod(owners, len(WEEKDAYS))
+    spilled = spill_ends > 0
+    next_days = (days[spilled] + 1) % len(WEEKDAYS)
+    owners = np.concatenate([users, users[spilled]])
+    starts = np.concatenate([days * MINUTES_PER_DAY + starts, next_days * MINUTES_PER_DAY])
+    ends = np.concatenate([days * MINUTES_PER_DAY + ends, next_days * MINUTES_PER_DAY + spill_ends[spilled]])
+    return intervals.minute_masks(owners, starts, ends, len(schedules), WEEK_MINUTES)
+
+class AvailabilityMatrix:
+    def __init__(self, matrix_path, index_path, capacity=256):
+        self.matrix_path = matrix_path
+        self.index_path = index_path
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()  # One refresh at a time, from listing to applying
+        self.capacity = capacity
+        self.rows = {}  # S3 key -> (row, etag, username)
+        self.bits = None  # Mapped on first use, so startup never touches numpy
+        self.last_refresh = 0.0
+
+    def ensure_loaded(self):
+        with self.lock:
+            if self.bits is not None:
+                return
+            try:
+                self.load()
+            except (OSError, ValueError, KeyError) as e:
+                logger.info(f"No usable availability snapshot ({e}), starting empty")
+                self.rows = {}
+                self.bits = self.create(self.capacity)
+            self.free_rows = sorted(set(range(len(self.bits))) - {row for row, _, _ in self.rows.values()}, reverse=True)
+
+    def create(self, capacity):
+        return np.lib.format.open_memmap(self.matrix_path, mode='w+', dtype=np.uint8, shape=(capacity, WEEK_MINUTES // 8))
+
+    def load(self):
+        with open(self.index_path, 'r') as f:
+            index = json.load(f)
+        bits = np.load(self.matrix_path, mmap_mode='r+')
+        if bits.shape[1] != WEEK_MINUTES // 8:
+            raise ValueError("snapshot has the wrong row width")
+        self.rows = {key: tuple(entry) for key, entry in index['rows'].items()}
+        self.bits = bits
+        logger.info(f"Loaded availability snapshot with {len(self.rows)} schedules")
+
+    @blocking_section("file.availability_snapshot")
+    def save(self):
+        self.bits.flush()
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'rows': self.rows}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def allocate_row(self):
+        if not self.free_rows:
+            # Double the snapshot; the old rows are copied across and the file swapped in place
+            capacity = len(self.bits)
+            tmp_path = f"{self.matrix_path}.tmp"
+            grown = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8, shape=(capacity * 2, WEEK_MINUTES // 8))
+            grown[:capacity] = self.bits
+            grown.flush()
+            del grown
+            os.replace(tmp_path, self.matrix_path)
+            self.bits = np.load(self.matrix_path, mmap_mode='r+')
+            self.free_rows = list(range(capacity * 2 - 1, capacity - 1, -1))
+        return self.free_rows.pop()
+
+    @staticmethod
+    def pack(schedules):
+        # One bit-packed week row per {key: schedule}, in order, and the user each one belongs to
+        return [schedule['username'] for schedule in schedules.values()], np.packbits(week_masks(list(schedules.values())), axis=1)
+
+    def refresh(self, max_age=0.0):
+        if time.monotonic() - self.last_refresh < max_age:
+            return
+        with self.refresh_lock:
+            # Concurrent callers wait for the refresh in flight instead of applying the same diff twice
+            if time.monotonic() - self.last_refresh < max_age:
+                return
+            self.ensure_loaded()
+            objects = list_s3_objects('schedules/')
+            with self.lock:
+                stale = [(key, etag) for key, etag in objects if self.rows.get(key, (None, None, None))[1] != etag]
+                live_keys = {key for key, _ in objects}
+                removed = [key for key in self.rows if key not in live_keys]
+
+            # Only the schedule objects that changed are downloaded and re-packed. Unreadable ones are
+            # skipped and fetched again on the next refresh
+            fetched = [(key, etag, data) for key, etag, data in fetch_s3_objects(stale) if data is not None]
+            valid, (usernames, packed) = parse_documents(self.pack, {key: data for key, _, data in fetched}) if fetched else ({}, ([], []))
+            fetched = [(key, etag) for key, etag, _ in fetched if key in valid]
+
+            with self.lock:
+                for key in removed:
+                    row, _, _ = self.rows.pop(key, (None, None, None))
+                    if row is None:
+                        continue
+                    self.bits[row] = 0
+                    self.free_rows.append(row)
+                for (key, etag), username, row_bits in zip(fetched, usernames, packed):
+                    row = self.rows[key][0] if key in self.rows else self.allocate_row()
+                    self.bits[row] = row_bits
+                    self.rows[key] = (row, etag, username)
+                if fetched or removed:
+                    self.save()
+                    logger.info(f"Availability matrix refreshed: {len(fetched)} updated, {len(removed)} removed, {len(self.rows)} total")
+                self.last_refresh = time.monotonic()
+
+    async def catch_up_async(self):
+        # Startup catch-up with any schedule changes made while we were offline
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.refresh)
+        except Exception as e:
+            logger.error(f"Failed to refresh the availability matrix: {e}", exc_info=True)
+
+    def day_masks(self, day):
+        # Unpack one day's columns for every user; 1440 is a multiple of 8 so days are byte-aligned
+        columns = slice(WEEKDAYS.index(day) * MINUTES_PER_DAY // 8, (WEEKDAYS.index(day) + 1) * MINUTES_PER_DAY // 8)
+        self.ensure_loaded()
+        with self.lock:
+            usernames = [username for _, _, username in self.rows.values()]
+            rows = np.array([row for row, _, _ in self.rows.values()], dtype=np.int64)
+            packed = self.bits[rows, columns]
+        return usernames, np.unpackbits(packed, axis=1).astype(bool)
+
+    def day_counts(self, day, date=None):
+        usernames, masks = self.day_masks(day)
+        if date is not None:
+            user_rows = {username: index for index, username in enumerate(usernames)}
+            absent_usernames, absent_masks = absence_index.masks(date, user_rows)
+            if absent_usernames:
+                masks[[user_rows[username] for username in absent_usernames]] &= ~absent_masks
+        return masks.sum(axis=0)
+
+    def week_counts(self, start_date):
+        # Seven consecutive dates in one pass: unpack the whole week once, reorder the day columns
+        # to follow the dates, cut each date's absences, then sum every user into a 7 x 1440 matrix
+        self.ensure_loaded()
+        with self.lock:
+            usernames = [username for _, _, username in self.rows.values()]
+            rows = np.array([row for row, _, _ in self.rows.values()], dtype=np.int64)
+            packed = self.bits[rows]
+        dates = [start_date + timedelta(days=offset) for offset in range(len(WEEKDAYS))]
+        week = np.unpackbits(packed, axis=1).astype(bool).reshape(len(usernames), len(WEEKDAYS), MINUTES_PER_DAY)
+        week = week[:, [date.weekday() for date in dates]]
+
+        user_rows = {username: index for index, username in enumerate(usernames)}
+        for index, (_, absent_usernames, absent_masks) in enumerate(absence_index.range_masks(start_date, len(dates), user_rows)):
+            if absent_usernames:
+                week[[user_rows[username] for username in absent_usernames], index] &= ~absent_masks
+        return dates, week.sum(axis=0)
+
+availability_matrix = AvailabilityMatrix(AVAILABILITY_MATRIX_FILE, AVAILABILITY_INDEX_FILE)
+
+async def availability_day_counts(day, date=None):
+    # Refresh the matrix and the absence index concurrently, then column-sum off the event loop
+    loop = asyncio.get_running_loop()
+    refresh = loop.run_in_executor(None, availability_matrix.refresh, AVAILABILITY_REFRESH_SECONDS)
+    if date is None:
+        await refresh
+        return await loop.run_in_executor(None, availability_matrix.day_counts, day)
+    await asyncio.gather(refresh, refresh_absences_async())
+    return await loop.run_in_executor(None, availability_matrix.day_counts, day, date)
+
+async def availability_week_counts(start_date):
+    # One matrix refresh and one absence sync shared by all seven dates
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(loop.run_in_executor(None, availability_matrix.refresh, AVAILABILITY_REFRESH_SECONDS), refresh_absences_async())
+    return await loop.run_in_executor(None, availability_matrix.week_counts, start_date)
+
+def availability_ticks(max_availability):
+    # A tick per person below 10, every second person below 20, every fifth above that
+    step = 1 if max_availability < 10 else 2 if max_availability < 20 else 5
+    return range(0, int(max_availability) + 1, step)
+
+def visualize_availability(availability_counts, ax=None):
     total_minutes = 24 * 60
-    availability_counts = np.zeros(total_minutes)
-    
-    # Process each user's availability times and count overlaps
-    for periods in day_availability.values():
-        for period in periods:
-            start_hour, start_minute = map(int, period[0].split(':'))
-            end_hour, end_minute = map(int, period[1].split(':'))
-            start_time = start_hour * 60 + start_minute
-            end_time = end_hour * 60 + end_minute
-            if end_time <= start_time:  # Crosses midnight
-                end_time += total_minutes
-            availability_counts[start_time:end_time] += 1
-    
+
     # Determine the maximum number of people available at any time
     max_availability = np.max(availability_counts)
 
-    # Create the plot
-    fig, ax = plt.subplots(figsize=(10, 3))
+    # Create the plot, unless we were handed the axes of a pre-built figure
+    if ax is None:
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots(figsize=(10, 3))
     ax.fill_between(range(total_minutes), 0, availability_counts[:total_minutes], color='blue', alpha=0.5)
     ax.set_xlim([0, total_minutes])
 
@@ -669,80 +2274,657 @@ def visualize_availability(day_availability):
     ax.set_xticklabels([f"{i}:00" for i in range(0, 25, 2)])  # Labels every two hours
 
     # Set y-axis based on maximum availability
-    if max_availability < 10:
-        ax.set_yticks(range(int(max_availability) + 1))
-    elif max_availability < 20:
-        ax.set_yticks(range(0, int(max_availability) + 1, 2))
-    else:
-        ax.set_yticks(range(0, int(max_availability) + 1, 5))
+    ax.set_yticks(availability_ticks(max_availability))
     
     ax.set_xlabel("Time (UTC)")
     ax.set_ylabel("Number of people available")
     ax.set_title("Overlap in User Availability")
-    plt.grid(True)
-    return fig
+    ax.grid(True)
+    return ax.figure
+
+# Chart rendering runs in a pool of worker processes so matplotlib never blocks the event loop
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+RENDER_CONCURRENCY = int(os.getenv("RENDER_CONCURRENCY", str(RENDER_WORKERS)))
+
+# 'matplotlib' draws real figures; 'raster' draws the same charts straight into a numpy array and
+# encodes the PNG itself. The commands can pick either one per call with their renderer option.
+CHART_BACKENDS = ['matplotlib', 'raster']
+CHART_BACKEND = os.getenv("CHART_BACKEND", "matplotlib")
+
+# Figures and axes built once per worker process and reused for every chart
+render_template = None
+heatmap_template = None
+
+def matplotlib_templates():
+    global render_template, heatmap_template
+    if render_template is None:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        render_template = plt.subplots(figsize=(10, 3))
+        heatmap_template = plt.subplots(1, 2, figsize=(12, 4), gridspec_kw={'width_ratios': [40, 1]})
+    return render_template, heatmap_template
+
+def init_render_worker():
+    # Only pay for importing matplotlib up front when it is the default renderer
+    if CHART_BACKEND == 'matplotlib':
+        matplotlib_templates()
+
+def render_availability_png(availability_counts):
+    fig, ax = matplotlib_templates()[0]
+    ax.clear()
+    visualize_availability(availability_counts, ax=ax)
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
 
-@bot.slash_command(guild_ids=[ALLIANCE_ID], name="poll-availability", description="Check user availability")
-async def poll_availability(ctx, day: discord.Option(str, "Enter the day", choices=["mon", "tue", "wed", "thu", "fri", "sat", "sun"])):
-    schedules = load_schedules()
-    day_availability = extract_day_availability(schedules, day.lower())
-    fig = visualize_availability(day_availability)
-    
-    # Save the plot to a BytesIO buffer
+def render_week_heatmap_png(week_counts, labels):
+    fig, (ax, colorbar_ax) = matplotlib_templates()[1]
+    ax.clear()
+    colorbar_ax.clear()
+    image = ax.imshow(week_counts, aspect='auto', interpolation='nearest', cmap='viridis', vmin=0)
+    fig.colorbar(image, cax=colorbar_ax, label="People available")
+
+    ax.set_xticks([i * 60 for i in range(0, 25, 2)])  # Ticks every two hours
+    ax.set_xticklabels([f"{i}:00" for i in range(0, 25, 2)])
+    ax.set_yticks(range(len(labels)))
+    ax.set_yticklabels(labels)
+    ax.set_xlabel("Time (UTC)")
+    ax.set_title("Availability for the week")
     buf = io.BytesIO()
     fig.savefig(buf, format='png')
-    buf.seek(0)
+    return buf.getvalue()
+
+# 5x8 bitmap font for printable ASCII, five column bytes per glyph with the top row in the low bit
+FONT_5X8 = (
+    "0000000000" "00005f0000" "0007000700" "147f147f14" "242a7f2a12" "2313086462" "3649562050" "0008070300"
+    "001c224100" "0041221c00" "2a1c7f1c2a" "08083e0808" "0080703000" "0808080808" "0000606000" "2010080402"
+    "3e5149453e" "00427f4000" "7249494946" "2141494d33" "1814127f10" "2745454539" "3c4a494931" "4121110907"
+    "3649494936" "464949291e" "0000140000" "0040340000" "0008142241" "1414141414" "0041221408" "0201590906"
+    "3e415d594e" "7c1211127c" "7f49494936" "3e41414122" "7f4141413e" "7f49494941" "7f09090901" "3e41415173"
+    "7f0808087f" "00417f4100" "2040413f01" "7f08142241" "7f40404040" "7f021c027f" "7f0408107f" "3e4141413e"
+    "7f09090906" "3e4151215e" "7f09192946" "2649494932" "03017f0103" "3f4040403f" "1f2040201f" "3f4038403f"
+    "6314081463" "0304780403" "6159494d43" "007f414141" "0204081020" "004141417f" "0402010204" "4040404040"
+    "0003070800" "2054547840" "7f28444438" "3844444428" "384444287f" "3854545418" "00087e0902" "18a4a49c78"
+    "7f08040478" "00447d4000" "2040403d00" "7f10284400" "00417f4000" "7c0478047c" "7c08040478" "3844444438"
+    "fc18242418" "18242418fc" "7c08040408" "4854545424" "04043f4424" "3c4040207c" "1c2040201c" "3c4030403c"
+    "4428102844" "4c9090907c" "4464544c44" "0008364100" "0000770000" "0041360800" "0201020402"
+)
+
+@functools.cache
+def font_glyphs():
+    columns = np.frombuffer(bytes.fromhex("".join(FONT_5X8)), dtype=np.uint8).reshape(-1, 5)
+    return np.unpackbits(columns[:, :, None], axis=2, bitorder='little').transpose(0, 2, 1).astype(bool)  # glyph, row, column
+
+def text_mask(text, scale=2):
+    codes = [ord(char) - 32 if 32 <= ord(char) < 127 else ord('?') - 32 for char in text]
+    cells = np.pad(font_glyphs()[codes], ((0, 0), (0, 0), (0, 1)))  # One blank column between glyphs
+    mask = cells.transpose(1, 0, 2).reshape(8, -1)[:, :-1]
+    return mask.repeat(scale, axis=0).repeat(scale, axis=1)
+
+def draw_text(image, text, x, y, color, anchor='center', vertical=False, scale=2):
+    # y is the vertical centre of the text; x is its left edge, centre or right edge depending on anchor
+    mask = text_mask(text, scale)
+    if vertical:
+        mask = np.rot90(mask)  # Reads bottom to top, like a y-axis label
+    height, width = mask.shape
+    left = {'left': x, 'center': x - width // 2, 'right': x - width}[anchor]
+    top = y - height // 2
+    image[top:top + height, left:left + width][mask] = color
+
+@functools.cache
+def viridis_lut():
+    # Piecewise-linear approximation of matplotlib's viridis through five of its stops
+    stops = np.array([[68, 1, 84], [59, 82, 139], [33, 145, 140], [94, 201, 98], [253, 231, 37]], dtype=float)
+    levels = np.linspace(0, 1, 256)
+    positions = np.linspace(0, 1, len(stops))
+    return np.stack([np.interp(levels, positions, stops[:, channel]) for channel in range(3)], axis=1).round().astype(np.uint8)
+
+def encode_png(image):
+    height, width, _ = image.shape
+    # Filter type 2 (up) stores each row as its difference from the row above; the charts are mostly
+    # vertical runs of one colour, so that leaves zlib long runs of zeros
+    rows = image.reshape(height, -1)
+    filtered = rows.copy()
+    filtered[1:] -= rows[:-1]
+    raw = np.concatenate([np.full((height, 1), 2, dtype=np.uint8), filtered], axis=1).tobytes()
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)  # 8-bit RGB
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw, 6)) + chunk(b'IEND', b'')
+
+RASTER_BLACK = (0, 0, 0)
+RASTER_GRID = (176, 176, 176)
+RASTER_FILL = (127, 127, 255)  # Blue at alpha 0.5 over white
+RASTER_GRID_UNDER_FILL = (88, 88, 215)  # The grid seen through the fill
+
+def hour_ticks(left, right):
+    # x positions of the ticks every two hours
+    return [(hour, left + round(hour * 60 * (right - left) / MINUTES_PER_DAY)) for hour in range(0, 25, 2)]
+
+def draw_time_axis(image, left, right, bottom):
+    for hour, x in hour_ticks(left, right):
+        image[bottom:bottom + 5, x] = RASTER_BLACK
+        draw_text(image, f"{hour}:00", x, bottom + 16, RASTER_BLACK)
+    draw_text(image, "Time (UTC)", (left + right) // 2, bottom + 42, RASTER_BLACK)
+
+def draw_frame(image, left, right, top, bottom):
+    image[top, left:right + 1] = image[bottom, left:right + 1] = RASTER_BLACK
+    image[top:bottom + 1, left] = image[top:bottom + 1, right] = RASTER_BLACK
+
+def raster_availability_png(availability_counts):
+    counts = np.asarray(availability_counts[:MINUTES_PER_DAY])
+    max_availability = int(counts.max())
+    y_max = max(max_availability, 1) * 1.05  # Headroom above the peak, like matplotlib's autoscaling
+    image = np.full((340, 1000, 3), 255, dtype=np.uint8)
+    left, right, top, bottom = 76, 965, 32, 284
+
+    def y_of(count):
+        return bottom - round(count * (bottom - top) / y_max)
+
+    # Each pixel column shows the peak of the minutes it covers, so short spikes are never dropped
+    plot_width = right - left
+    peaks = np.maximum.reduceat(counts, np.arange(plot_width) * MINUTES_PER_DAY // plot_width)
+    column_tops = bottom - np.round(peaks * (bottom - top) / y_max)
+    filled = np.arange(top, bottom)[:, None] >= column_tops[None, :]
+    np.copyto(image[top:bottom, left:right], np.array(RASTER_FILL, dtype=np.uint8), where=filled[:, :, None])
+
+    # Grid lines go on afterwards, shaded where the translucent fill covers them; the frame hides the edges
+    for tick in availability_ticks(max_availability):
+        if y_of(tick) < bottom:
+            image[y_of(tick), left:right] = np.where(filled[y_of(tick) - top, :, None], RASTER_GRID_UNDER_FILL, RASTER_GRID)
+    for _, x in hour_ticks(left, right)[:-1]:
+        image[top:bottom, x] = np.where(filled[:, x - left, None], RASTER_GRID_UNDER_FILL, RASTER_GRID)
+
+    draw_frame(image, left, right, top, bottom)
+    draw_time_axis(image, left, right, bottom)
+    for tick in availability_ticks(max_availability):
+        image[y_of(tick), left - 5:left] = RASTER_BLACK
+        draw_text(image, str(tick), left - 8, y_of(tick), RASTER_BLACK, anchor='right')
+    draw_text(image, "Number of people available", 14, (top + bottom) // 2, RASTER_BLACK, vertical=True)
+    draw_text(image, "Overlap in User Availability", (left + right) // 2, 15, RASTER_BLACK)
+    return encode_png(image)
+
+def raster_week_heatmap_png(week_counts, labels):
+    week_counts = np.asarray(week_counts)
+    v_max = max(int(week_counts.max()), 1)
+    image = np.full((400, 1200, 3), 255, dtype=np.uint8)
+    left, right, top, bottom = 132, 1060, 32, 344
+    bar_left, bar_right = 1080, 1100
+    plot_width, plot_height = right - left, bottom - top
+
+    # Nearest-neighbour sampling of the 7x1440 grid, coloured through the viridis table
+    rows = np.arange(plot_height) * len(labels) // plot_height
+    columns = np.arange(plot_width) * MINUTES_PER_DAY // plot_width
+    levels = week_counts[rows][:, columns] * 255 // v_max
+    image[top:bottom, left:right] = viridis_lut()[levels]
+    draw_frame(image, left, right, top, bottom)
+    draw_time_axis(image, left, right, bottom)
+    for day, label in enumerate(labels):
+        y = top + round((day + 0.5) * plot_height / len(labels))
+        image[y, left - 5:left] = RASTER_BLACK
+        draw_text(image, label, left - 8, y, RASTER_BLACK, anchor='right')
+    draw_text(image, "Availability for the week", (left + right) // 2, 15, RASTER_BLACK)
+
+    # Colour bar from 0 at the bottom to the busiest minute at the top
+    image[top:bottom, bar_left:bar_right] = viridis_lut()[np.linspace(255, 0, plot_height).round().astype(int)][:, None]
+    draw_frame(image, bar_left, bar_right, top, bottom)
+    for tick in availability_ticks(v_max):
+        y = bottom - round(tick * plot_height / v_max)
+        image[y, bar_right:bar_right + 5] = RASTER_BLACK
+        draw_text(image, str(tick), bar_right + 8, y, RASTER_BLACK, anchor='left')
+    draw_text(image, "People available", 1180, (top + bottom) // 2, RASTER_BLACK, vertical=True)
+    return encode_png(image)
+
+CHART_RENDERERS = {
+    'matplotlib': {'availability': render_availability_png, 'week': render_week_heatmap_png},
+    'raster': {'availability': raster_availability_png, 'week': raster_week_heatmap_png},
+}
+
+class ChartRenderer:
+    def __init__(self, workers, concurrency):
+        self.workers = workers
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.queue_depth = 0
+        self.peak_queue_depth = 0
+        self.in_flight = 0
+        self.rendered = 0
+        self.failed = 0
+        self.restarts = 0
+        self.render_seconds = 0.0
+        self.restart_lock = threading.Lock()
+        # Workers started by spawn or forkserver import this module too; only the bot process owns a pool
+        self.executor = self.start_pool('fork') if multiprocessing.parent_process() is None else None
+
+    def start_pool(self, start_method):
+        # Start the workers up front and pre-warm each one so no command pays for importing its renderer
+        executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(start_method), initializer=init_render_worker)
+        for _ in range(self.workers):
+            executor.submit(os.getpid)
+        return executor
+
+    def restart_pool(self, broken):
+        # Every render that was in flight sees the same broken pool; the first one to get here replaces it.
+        # By now the bot runs executor and gateway threads, so the new workers are not forked from it
+        with self.restart_lock:
+            if self.executor is not broken:
+                return
+            logger.error("A chart worker died, restarting the render pool")
+            self.restarts += 1
+            self.executor = self.start_pool('forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    async def render(self, func, *args):
+        self.queue_depth += 1
+        self.peak_queue_depth = max(self.peak_queue_depth, self.queue_depth)
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.queue_depth -= 1
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        executor = self.executor
+        try:
+            with metrics.timed('blocking', f"render.{func.__name__}"):
+                return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            self.failed += 1
+            self.restart_pool(executor)
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.rendered += 1
+            self.render_seconds += time.perf_counter() - started
+            self.in_flight -= 1
+            self.semaphore.release()
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'concurrency': self.concurrency,
+            'queue_depth': self.queue_depth,
+            'peak_queue_depth': self.peak_queue_depth,
+            'in_flight': self.in_flight,
+            'rendered': self.rendered,
+            'failed': self.failed,
+            'restarts': self.restarts,
+            'avg_render_ms': round(1000 * self.render_seconds / self.rendered, 1) if self.rendered else 0.0,
+        }
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+chart_renderer = ChartRenderer(RENDER_WORKERS, RENDER_CONCURRENCY)
+
+# Rendered PNGs are cached by a hash of the availability vector, so repeat polls skip rendering entirely
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "64"))
+RENDER_CACHE_TTL = float(os.getenv("RENDER_CACHE_TTL", "900"))
+
+class RenderCache:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (stored_at, png), oldest first
+        self.pending = {}  # key -> future for renders already in progress
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def key_for(availability_counts, **options):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.ascontiguousarray(availability_counts, dtype=np.int32).tobytes())
+        digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        stored_at, png = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self.entries[key]
+            self.expirations += 1
+            return None
+        self.entries.move_to_end(key)
+        return png
+
+    def put(self, key, png):
+        self.entries[key] = (time.monotonic(), png)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_render(self, key, func, *args):
+        png = self.get(key)
+        if png is not None:
+            self.hits += 1
+            return png
+
+        # Identical requests that arrive while a render is running share its result. If the request
+        # that owns the render is cancelled, the shared future is cancelled too and a waiter renders it
+        while key in self.pending:
+            pending = self.pending[key]
+            try:
+                png = await asyncio.shield(pending)
+                self.hits += 1
+                return png
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # This request was cancelled, not the render it was waiting on
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self.pending[key] = future
+        try:
+            png = await chart_renderer.render(func, *args)
+            self.put(key, png)
+            future.set_result(png)
+            return png
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark as retrieved when nobody else was waiting
+            raise
+        finally:
+            del self.pending[key]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+render_cache = RenderCache(RENDER_CACHE_SIZE, RENDER_CACHE_TTL)
+
+async def render_availability_chart(availability_counts, backend=None, **options):
+    backend = backend or CHART_BACKEND
+    key = RenderCache.key_for(availability_counts, chart='availability', backend=backend, **options)
+    return await render_cache.get_or_render(key, CHART_RENDERERS[backend]['availability'], availability_counts)
+
+async def render_week_heatmap(week_counts, labels, backend=None):
+    backend = backend or CHART_BACKEND
+    key = RenderCache.key_for(week_counts, chart='week', backend=backend, labels=labels)
+    return await render_cache.get_or_render(key, CHART_RENDERERS[backend]['week'], week_counts, labels)
+
+# The week heatmap answers within this many seconds or says it is still working; the work carries on
+# in the background and lands in the render cache, so asking again shortly afterwards is instant
+WEEK_HEATMAP_BUDGET_SECONDS = float(os.getenv("WEEK_HEATMAP_BUDGET_SECONDS", "2.5"))
+
+async def week_heatmap_png(start_date, backend=None):
+    dates, week_counts = await availability_week_counts(start_date)
+    return await render_week_heatmap(week_counts, [date.strftime('%a %m/%d') for date in dates], backend)
+
+def parse_date(date):
+    # MM/DD or MM/DD/YYYY, defaulting to today (UTC)
+    if not date:
+        return datetime.utcnow()
+    if len(date.split('/')) == 2:
+        date = f"{date}/{datetime.utcnow().year}"  # Assume current year if no year provided
+    return datetime.strptime(date, '%m/%d/%Y')
+
+def format_minute(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+def best_windows(availability_counts, window, min_count, top):
+    # Sliding-window minimum: the head-count available for the whole window starting at each minute
+    guaranteed = np.lib.stride_tricks.sliding_window_view(availability_counts, window).min(axis=1)
+    cumulative = np.concatenate([[0], np.cumsum(availability_counts)])
+    totals = cumulative[window:] - cumulative[:-window]
+
+    # Rank by guaranteed head-count, then total availability, then earliest start
+    candidates = np.flatnonzero(guaranteed >= min_count)
+    ranked = candidates[np.lexsort((candidates, -totals[candidates], -guaranteed[candidates]))]
+
+    # Keep the best windows that don't overlap one already picked
+    picks = []
+    for start in ranked.tolist():
+        if all(abs(start - picked) >= window for picked in picks):
+            picks.append(start)
+            if len(picks) == top:
+                break
+    return [(start, start + window, int(guaranteed[start])) for start in picks]
+
+@bot.slash_command(guild_ids=[ALLIANCE_ID], name="poll-availability", description="Check user availability")
+@interaction_lane('heavy')
+async def poll_availability(ctx, day: discord.Option(str, "Enter the day", choices=WEEKDAYS),
+                            renderer: discord.Option(str, "Chart renderer", choices=CHART_BACKENDS, required=False)):
+    png = await render_availability_chart(await availability_day_counts(day.lower()), renderer)
     
     # Send the image in the channel
-    await ctx.respond(file=discord.File(buf, 'availability.png'))
-    plt.close(fig)  # Close the figure after saving to free memory
+    await ctx.respond(file=discord.File(io.BytesIO(png), 'availability.png'))
 
 @bot.slash_command(guild_ids=[ALLIANCE_ID], name="poll-availability-day", description="Check user availability for a specific day or today by default")
-async def poll_availability_day(ctx, date: discord.Option(str, "Enter the date (MM/DD or MM/DD/YYYY)", required=False)):
-    if not date:
-        date_obj = datetime.utcnow()
+@interaction_lane('heavy')
+async def poll_availability_day(ctx, date: discord.Option(str, "Enter the date (MM/DD or MM/DD/YYYY)", required=False),
+                                renderer: discord.Option(str, "Chart renderer", choices=CHART_BACKENDS, required=False)):
+    try:
+        date_obj = parse_date(date)
+    except ValueError:
+        await ctx.respond("Invalid date format. Please use MM/DD or MM/DD/YYYY.")
+        return
+
+    weekday = WEEKDAYS[date_obj.weekday()]
+
+    png = await render_availability_chart(await availability_day_counts(weekday, date_obj), renderer)
+    await ctx.respond(file=discord.File(io.BytesIO(png), 'availability.png'))
+
+@bot.slash_command(guild_ids=[ALLIANCE_ID], name="poll-availability-week", description="Heatmap of user availability for the seven days from a date (today by default)")
+@interaction_lane('heavy')
+async def poll_availability_week(ctx, date: discord.Option(str, "Enter the first date (MM/DD or MM/DD/YYYY)", required=False),
+                                 renderer: discord.Option(str, "Chart renderer", choices=CHART_BACKENDS, required=False)):
+    try:
+        start_date = parse_date(date)
+    except ValueError:
+        await ctx.respond("Invalid date format. Please use MM/DD or MM/DD/YYYY.")
+        return
+
+    # Once the scheduler has deferred the interaction there is no deadline left to protect
+    budget = None if ctx.response.is_done() else WEEK_HEATMAP_BUDGET_SECONDS
+    started = time.perf_counter()
+    work = asyncio.ensure_future(week_heatmap_png(start_date, renderer))
+    try:
+        png = await asyncio.wait_for(asyncio.shield(work), budget)
+    except asyncio.TimeoutError:
+        def log_late_failure(task):
+            # Nobody awaits the work any more, so this is the only place its failure can surface
+            if not task.cancelled() and task.exception() is not None:
+                logger.error(f"Week heatmap from {start_date:%m/%d} failed after its budget: {task.exception()}", exc_info=task.exception())
+        work.add_done_callback(log_late_failure)
+        logger.warning(f"Week heatmap from {start_date:%m/%d} exceeded its {WEEK_HEATMAP_BUDGET_SECONDS}s budget")
+        await ctx.respond("The weekly heatmap is still being prepared, please try again in a few seconds.", ephemeral=True)
+        return
+    logger.debug(f"Week heatmap from {start_date:%m/%d} took {time.perf_counter() - started:.2f}s")
+    await ctx.respond(file=discord.File(io.BytesIO(png), 'availability-week.png'))
+
+@bot.slash_command(guild_ids=[ALLIANCE_ID], name="best-window", description="Find the best times for a rally")
+@interaction_lane('heavy')
+async def best_window(ctx,
+                      when: discord.Option(str, "Day (mon-sun) or date (MM/DD or MM/DD/YYYY)"),
+                      length: discord.Option(int, "Window length in minutes", min_value=5, max_value=MINUTES_PER_DAY, default=60),
+                      min_count: discord.Option(int, "Minimum number of people available", min_value=1, default=1),
+                      top: discord.Option(int, "Number of windows to show", min_value=1, max_value=10, default=5)):
+    # A bare weekday uses the recurring schedules; a date also applies that date's absences
+    if when.lower()[:3] in WEEKDAYS:
+        weekday, date_obj, label = when.lower()[:3], None, when.lower()[:3].capitalize()
     else:
         try:
-            if len(date.split('/')) == 2:
-                date = f"{date}/{datetime.utcnow().year}"  # Assume current year if no year provided
-            date_obj = datetime.strptime(date, '%m/%d/%Y')  # Fixed missing parenthesis here
+            date_obj = parse_date(when)
         except ValueError:
-            await ctx.respond("Invalid date format. Please use MM/DD or MM/DD/YYYY.")
+            await ctx.respond("Invalid day or date. Use mon-sun, MM/DD or MM/DD/YYYY.", ephemeral=True)
             return
+        weekday, label = WEEKDAYS[date_obj.weekday()], date_obj.strftime('%a %m/%d')
 
-    weekday = date_obj.strftime('%a').lower()[:3]  # Use first three letters for compatibility
+    windows = best_windows(await availability_day_counts(weekday, date_obj), length, min_count, top)
+    if not windows:
+        await ctx.respond(f"No {length}-minute window on {label} has at least {min_count} people available.")
+        return
 
-    schedules = load_schedules()
-    day_availability = extract_day_availability(schedules, weekday)
-    absences = load_absences()  # Corrected spelling of 'absences' here
-    adjust_availability_for_absences(day_availability, absences, date_obj)
-    fig = visualize_availability(day_availability)
+    embed = discord.Embed(title=f"Best {length}-minute windows on {label}", color=discord.Color.blue())
+    embed.description = "\n".join(f"{idx + 1}. {format_minute(start)}-{format_minute(end)} UTC: {count} available" for idx, (start, end, count) in enumerate(windows))
+    await ctx.respond(embed=embed)
+
+@bot.slash_command(guild_ids=[ALLIANCE_ID], name="chart-cache-stats", description="Show availability chart cache statistics.")
+@interaction_lane(ephemeral=True)
+@leadership_only()  # Ensure only members with the leadership role can use this command
+async def chart_cache_stats(ctx: discord.ApplicationContext):
+    embed = discord.Embed(title="Availability Chart Cache", color=discord.Color.blue())
+    embed.add_field(name="Cache", value="\n".join(f"{name}: {value}" for name, value in render_cache.stats().items()), inline=True)
+    embed.add_field(name="Renderer", value="\n".join(f"{name}: {value}" for name, value in chart_renderer.stats().items()), inline=True)
+    await ctx.respond(embed=embed, ephemeral=True)
+
+# Dashboard keys live in DynamoDB; calls run on their own executor and user_id -> key lookups are cached
+USER_KEY_CACHE_SIZE = int(os.getenv("USER_KEY_CACHE_SIZE", "4096"))
+
+class UserKeyStore:
+    def __init__(self, table_factory, max_workers, cache_size):
+        self.table_factory = table_factory  # Opens the table lazily, on the first DynamoDB call
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dynamodb')
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # user_id -> key, least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def table(self):
+        return self.table_factory()
+
+    def remember(self, user_id, user_key):
+        self.cache[user_id] = user_key
+        self.cache.move_to_end(user_id)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    @blocking_section("dynamodb.get_or_create")
+    def fetch_or_create(self, user_id, username):
+        # Check if the user already has an entry in the DynamoDB table
+        response = self.table.get_item(Key={'user_id': user_id})
+        if 'Item' in response:
+            return response['Item']['key']
+
+        # No record found, create one. The condition stops two concurrent first-time requests minting two UUIDs
+        new_uuid = str(uuid4())
+        try:
+            self.table.put_item(Item={
+                'user_id': user_id,
+                'key': new_uuid,
+                'username': username
+            }, ConditionExpression='attribute_not_exists(user_id)')
+            return new_uuid
+        except self.table.meta.client.exceptions.ConditionalCheckFailedException:
+            # Another request created the record first, so use theirs
+            response = self.table.get_item(Key={'user_id': user_id}, ConsistentRead=True)
+            return response['Item']['key']
+
+    async def get_key(self, user_id, username):
+        if user_id in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(user_id)
+            return self.cache[user_id]
+        self.misses += 1
+        user_key = await asyncio.get_running_loop().run_in_executor(self.executor, self.fetch_or_create, user_id, username)
+        self.remember(user_id, user_key)
+        return user_key
+
+    @blocking_section("dynamodb.scan")
+    def prewarm(self):
+        # Scan every key up front so most /availability calls never leave the process
+        scan_kwargs = {'ProjectionExpression': 'user_id, #k', 'ExpressionAttributeNames': {'#k': 'key'}}
+        loaded = 0
+        while loaded < self.cache_size:
+            response = self.table.scan(**scan_kwargs)
+            for item in response.get('Items', []):
+                self.remember(int(item['user_id']), item['key'])
+                loaded += 1
+            if 'LastEvaluatedKey' not in response:
+                break
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        logger.info(f"Pre-warmed {min(loaded, self.cache_size)} availability keys")
 
-    buf = io.BytesIO()
-    fig.savefig(buf, format='png')
-    buf.seek(0)
-    await ctx.respond(file=discord.File(buf, 'availability.png'))
-    plt.close(fig)
+    async def prewarm_async(self):
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.prewarm)
+        except Exception as e:
+            logger.error(f"Failed to pre-warm availability keys: {e}")
+
+user_keys = UserKeyStore(dynamodb_table, DYNAMODB_MAX_WORKERS, USER_KEY_CACHE_SIZE)
+
+# Component stats exported next to the latency histograms
+metrics.sources.update({
+    'render_cache': render_cache.stats,
+    'chart_renderer': chart_renderer.stats,
+    'log_sink': log_sink.stats,
+    'speedup_log_sink': speedup_log_sink.stats,
+    'join_pipeline': join_pipeline.stats,
+    'user_keys': lambda: {'cached': len(user_keys.cache), 'hits': user_keys.hits, 'misses': user_keys.misses},
+    'interaction_scheduler': interaction_scheduler.stats,
+})
+
+def format_latencies(kind, limit=10):
+    histograms, in_flight, errors = metrics.snapshot()
+    # Slowest first by total time spent, which is where optimisation pays off
+    rows = sorted(((name, hist) for (hist_kind, name), hist in histograms.items() if hist_kind == kind), key=lambda row: -row[1][2])[:limit]
+    lines = []
+    for name, (buckets, count, total, slowest) in rows:
+        histogram = LatencyHistogram()
+        histogram.buckets, histogram.count = buckets, count
+        line = f"{name}: {count} calls, avg {1000 * total / count:.1f} ms, p50 <={1000 * histogram.quantile(0.5):g} ms, p99 <={1000 * histogram.quantile(0.99):g} ms, max {1000 * slowest:.1f} ms"
+        if in_flight.get((kind, name)):
+            line += f", {in_flight[(kind, name)]} running"
+        if errors.get((kind, name)):
+            line += f", {errors[(kind, name)]} failed"
+        lines.append(line)
+    return "\n".join(lines)
+
+@bot.slash_command(guild_ids=[ALLIANCE_ID], name="handler-timings", description="Show time spent in event handlers.")
+@interaction_lane(ephemeral=True)
+@leadership_only()  # Ensure only members with the leadership role can use this command
+async def handler_timings_command(ctx: discord.ApplicationContext):
+    lines = format_latencies('handler', limit=25)
+    await ctx.respond("```" + (lines or "No handler calls recorded yet.") + "```", ephemeral=True)
+
+@bot.slash_command(guild_ids=[ALLIANCE_ID], name="botstats", description="Show bot latency and load statistics.")
+@interaction_lane(ephemeral=True)
+@leadership_only()  # Ensure only members with the leadership role can use this command
+async def botstats(ctx: discord.ApplicationContext):
+    embed = discord.Embed(title="Bot Statistics", color=discord.Color.blue())
+    for kind, title in (('command', "Commands"), ('component', "Components"), ('event', "Events"), ('handler', "Handlers"), ('blocking', "Blocking sections")):
+        lines = format_latencies(kind, limit=6)
+        if lines:
+            embed.add_field(name=title, value=f"```{lines[:800]}```", inline=False)
+    lag = metrics.loop_lag
+    if lag.count:
+        embed.add_field(name="Event loop lag", value=f"avg {1000 * lag.total / lag.count:.1f} ms, p99 <={1000 * lag.quantile(0.99):g} ms, max {1000 * lag.slowest:.1f} ms", inline=False)
+    for source, stats in metrics.sources.items():
+        embed.add_field(name=source, value="\n".join(f"{name}: {value}" for name, value in stats().items()), inline=True)
+    await ctx.respond(embed=embed, ephemeral=True)
 
 @bot.slash_command(guild_ids=[ALLIANCE_ID], name="availability", description="Manage your availability")
+@interaction_lane('heavy', ephemeral=True)
 async def availability(ctx):
     user_id = ctx.author.id # Get the user's ID
     username = ctx.author.display_name  # Gets the nickname if set, otherwise gets the username
 
-    # Check if the user already has an entry in the DynamoDB table
-    response = table.get_item(Key={'user_id': user_id})
-    if 'Item' not in response:
-        # No record found, create one
-        new_uuid = str(uuid4())
-        table.put_item(Item={
-            'user_id': user_id,
-            'key': new_uuid,
-            'username': username
-        })
-        user_key = new_uuid
-    else:
-        # Record exists, fetch the UUID
-        user_key = response['Item']['key']
+    # Look up (or create) the user's dashboard key without blocking the event loop
+    user_key = await user_keys.get_key(user_id, username)
 
     # Create a message embed with a button
     embed = discord.Embed(
@@ -761,4 +2943,11 @@ async def availability(ctx):
     await ctx.respond("Check your DM for the availability dashboard link!", ephemeral=True)
 
 
-bot.run(os.getenv("BOT_TOKEN"))
+IMPORT_SECONDS = time.perf_counter() - PROCESS_STARTED
+
+if __name__ == "__main__":
+    if STARTUP_BENCHMARK:
+        logger.info(f"Module import took {IMPORT_SECONDS:.2f}s")
+    if shared_state is not None:
+        wait_for_gateway_lease()
+    bot.run(os.getenv("BOT_TOKEN"))
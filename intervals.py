@@ -0,0 +1,39 @@
+# Interval engine for availability schedules: every "HH:MM" pair is parsed once into integer
+# minute arrays, and per-minute coverage is computed with a difference array and np.cumsum.
+# Periods are [start, end) in minutes from midnight; one that ends at or before its start
+# crosses midnight and its remainder is reported separately so callers can move it to the next day.
+import numpy as np
+
+MINUTES_PER_DAY = 24 * 60
+
+def parse_minutes(times):
+    if not times:
+        return np.zeros(0, dtype=np.int64)
+    # Fast path: zero-padded "HH:MM" strings are decoded as one block of digits. Anything else,
+    # including malformed input, goes through int() below so it raises ValueError
+    joined = ''.join(times)
+    if len(joined) == 5 * len(times) and joined.isascii():
+        digits = np.frombuffer(joined.encode('ascii'), dtype=np.uint8).reshape(-1, 5).astype(np.int64) - ord('0')
+        if np.all(digits[:, 2] == ord(':') - ord('0')) and np.all((digits[:, [0, 1, 3, 4]] >= 0) & (digits[:, [0, 1, 3, 4]] <= 9)):
+            return (digits[:, 0] * 10 + digits[:, 1]) * 60 + digits[:, 3] * 10 + digits[:, 4]
+    return np.array([int(hour) * 60 + int(minute) for hour, minute in (t.split(':') for t in times)], dtype=np.int64)
+
+def parse_period_lists(period_lists):
+    # Parse many users' periods in one pass. Returns the owning list index of every period,
+    # its same-day (start, end), and for periods that cross midnight the end minute on the next day
+    counts = np.array([len(periods) for periods in period_lists], dtype=np.int64)
+    owners = np.repeat(np.arange(len(period_lists)), counts)
+    minutes = np.clip(parse_minutes([t for periods in period_lists for period in periods for t in period[:2]]), 0, MINUTES_PER_DAY)
+    starts, ends = minutes[0::2], minutes[1::2]
+    overnight = ends <= starts  # Crosses midnight
+    spill_ends = np.where(overnight, ends, 0)
+    return owners, starts, np.where(overnight, MINUTES_PER_DAY, ends), spill_ends
+
+def join_intervals(*intervals):
+    return np.concatenate([starts for starts, _ in intervals]), np.concatenate([ends for _, ends in intervals])
+
+def minute_masks(owners, starts, ends, rows, minutes=MINUTES_PER_DAY):
+    # One boolean row of minutes per owner, built from a single flattened difference array
+    width = minutes + 1
+    diff = np.bincount(owners * width + starts, minlength=rows * width) - np.bincount(owners * width + ends, minlength=rows * width)
+    return np.cumsum(diff.reshape(rows, width)[:, :minutes], axis=1) > 0
@@ -0,0 +1,1124 @@
+# Offline replay and load test for felv2's handlers.
+#
+# Drives on_member_join, on_member_update, UnlockButton, DaysModal, FollowUpModal and the availability commands
+# with fake guild/member/channel/interaction objects and in-memory S3 and DynamoDB stand-ins, then
+# reports throughput, p50/p99 latency per event type, how long interactions waited for their first
+# response or defer, and how long the event loop stalled.
+#
+#   python replay.py --synthetic 2000 --rate 200
+#   python replay.py --synthetic 2000 --write-events events.jsonl
+#   python replay.py --events events.jsonl --speed 4 --json report.json
+#   python replay.py --chart-benchmark 50
+#   python replay.py --s3-benchmark
+#   python replay.py --window-benchmark 1000 5000 10000
+#   python replay.py --view-benchmark
+#   python replay.py --join-burst 500
+#   python replay.py --association-benchmark 100000
+#   python replay.py --registry-benchmark 50
+#   python replay.py --alliance-load 300 --submits-per-alliance 3
+#   python replay.py --week-heatmap-check 20 --schedules 5000
+#
+# Event streams are JSONL, one event per line: {"t": seconds from start, "type": ..., ...fields}.
+# Types: member_join, member_update, unlock, days_modal, follow_up, poll_availability, poll_availability_day,
+# poll_availability_week, best_window. Fields are the ones built by synthetic_events below; the
+# poll_availability* events also take an optional "renderer" ("matplotlib" or "raster").
+#
+# --chart-benchmark renders the day chart and the week heatmap with each chart backend in a fresh
+# interpreter and compares render time and peak RSS; sample PNGs are left in the working directory.
+#
+# --s3-benchmark syncs schedules/ and absences/ from the S3 stand-in at 50, 500 and 5000 users and
+# reports the cold sync, a warm sync with nothing changed, and a warm sync after 1% of the
+# schedules were edited.
+#
+# --window-benchmark loads the availability matrix and absence index at each member count, then
+# times what /best-window does per query: the day's absence-adjusted counts and the window search.
+#
+# --view-benchmark sends N /registration menus through the view store, once as stored per-message
+# views and once as persistent-view templates, and reports the store's size and retained memory.
+#
+# --join-burst delivers N joins at once and waits for the join pipeline and the log sink to finish.
+# It reports the end-to-end latency and the messages per channel, and counts any send that the
+# channel or global token bucket would not have allowed.
+#
+# --association-benchmark loads N barricade associations into the old list-of-tuples storage and into
+# AssociationIndex, then times loading, lookups by message and by member, and adds and removes
+# including what it takes to persist them.
+#
+# --registry-benchmark has N submitters each send a run of /register days concurrently, once through the
+# old load-and-rewrite JSON registry and once through SpeedupRegistry, and reports submissions per second,
+# latency, the longest loop stall and any submission whose value did not stick.
+#
+# --alliance-load has every member of N new alliances submit the registration details modal at once
+# and checks that each alliance got exactly one diplomacy role and channel, with one first-member welcome.
+#
+# --week-heatmap-check renders /poll-availability-week for the --schedules members as a directly answered
+# interaction and exits non-zero if any render ran past WEEK_HEATMAP_BUDGET_SECONDS and got the
+# "still being prepared" reply instead of the chart.
+import argparse, asyncio, functools, gc, itertools, json, multiprocessing, os, random, resource, shutil, statistics, sys, tempfile, time, tracemalloc
+from datetime import datetime, timedelta
+
+REPLAY_ENV = {
+    "LOGS_CHANNEL_ID": "900000000000000001",
+    "BARRICADE_CHANNEL_ID": "900000000000000002",
+    "SPEEDUP_LOG_CHANNEL_ID": "900000000000000003",
+    "LEADERSHIP_ROLE_ID": "910000000000000001",
+    "GENERAL_ALLIANCE_ROLE_ID": "910000000000000002",
+    "FEL_ALLIANCE_ROLE_ID": "910000000000000003",
+    "FEL_ACADEMY_ROLE_ID": "910000000000000004",
+    "EXTERNAL_ALLIANCE_ROLE_ID": "910000000000000005",
+    "EXTERNAL_STATE_ROLE_ID": "910000000000000006",
+    "EXTERNAL_GAME_ROLE_ID": "910000000000000007",
+}
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+ids = itertools.count(1_000_000_000_000_000)
+
+# In-memory stand-ins for the slice of boto3 that felv2 uses
+
+class FakeBody:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+class FakePaginator:
+    def __init__(self, objects, latency=0.0, page_size=1000):
+        self.objects = objects
+        self.latency = latency
+        self.page_size = page_size
+
+    def paginate(self, Bucket, Prefix):
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))
+        for start in range(0, max(len(keys), 1), self.page_size):
+            time.sleep(self.latency)
+            yield {'Contents': [{'Key': key, 'ETag': self.objects[key][0]} for key in keys[start:start + self.page_size]]}
+
+class FakeS3:
+    def __init__(self, latency=0.0):
+        self.latency = latency  # Simulated round trip per request; boto3 blocks the calling thread
+        self.objects = {}  # key -> (etag, body)
+        self.versions = itertools.count(1)
+        self.gets = 0
+
+    def put(self, key, data):
+        self.objects[key] = (f'"{next(self.versions)}"', json.dumps(data).encode('utf-8'))
+
+    def get_paginator(self, name):
+        return FakePaginator(self.objects, self.latency)
+
+    def get_object(self, Bucket, Key):
+        time.sleep(self.latency)
+        self.gets += 1
+        etag, body = self.objects[Key]
+        return {'ETag': etag, 'Body': FakeBody(body)}
+
+class ConditionalCheckFailedException(Exception):
+    pass
+
+class FakeTable:
+    def __init__(self):
+        self.items = {}
+        exceptions = type('Exceptions', (), {'ConditionalCheckFailedException': ConditionalCheckFailedException})
+        self.meta = type('Meta', (), {'client': type('Client', (), {'exceptions': exceptions})})
+
+    def get_item(self, Key, ConsistentRead=False):
+        item = self.items.get(Key['user_id'])
+        return {'Item': dict(item)} if item else {}
+
+    def put_item(self, Item, ConditionExpression=None):
+        if ConditionExpression and Item['user_id'] in self.items:
+            raise ConditionalCheckFailedException()
+        self.items[Item['user_id']] = dict(Item)
+
+    def scan(self, **kwargs):
+        return {'Items': [dict(item) for item in self.items.values()]}
+
+# Fake Discord objects, just enough of the py-cord surface for the handlers under test
+
+class FakeRole:
+    def __init__(self, role_id, name, guild=None):
+        self.id = role_id
+        self.name = name
+        self.guild = guild
+
+class FakeCategory:
+    def __init__(self, category_id, name):
+        self.id = category_id
+        self.name = name
+
+class FakeMessage:
+    def __init__(self, channel, **kwargs):
+        self.id = next(ids)
+        self.channel = channel
+        self.kwargs = kwargs
+
+    async def delete(self):
+        self.channel.messages.pop(self.id, None)
+
+class FakeChannel:
+    def __init__(self, channel_id, name, latency):
+        self.id = channel_id
+        self.name = name
+        self.latency = latency
+        self.messages = {}
+        self.sent = 0
+        self.sent_at = []  # When each send reached Discord, for checking the rate-limit budget
+
+    async def send(self, content=None, **kwargs):
+        self.sent_at.append(time.monotonic())
+        await asyncio.sleep(self.latency)  # Discord round trip
+        message = FakeMessage(self, content=content, **kwargs)
+        self.messages[message.id] = message
+        self.sent += 1
+        return message
+
+    async def fetch_message(self, message_id):
+        await asyncio.sleep(self.latency)
+        return self.messages.get(message_id) or FakeMessage(self)
+
+@functools.cache
+def fake_text_channel_class():
+    # GuildIndex only indexes discord.TextChannel instances; discord comes in with felv2, not at startup
+    import discord
+    class FakeTextChannel(FakeChannel, discord.TextChannel):
+        pass
+    return FakeTextChannel
+
+class FakeMember:
+    def __init__(self, guild, member_id, name, roles=()):
+        self.guild = guild
+        self.id = member_id
+        self.name = name
+        self.nick = None
+        self.roles = list(roles)
+        self.bot = False
+
+    @property
+    def display_name(self):
+        return self.nick or self.name
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>"
+
+    def __str__(self):
+        return self.name
+
+    def get_role(self, role_id):
+        return next((role for role in self.roles if role.id == role_id), None)
+
+    def copy(self):
+        member = FakeMember(self.guild, self.id, self.name, self.roles)
+        member.nick = self.nick
+        return member
+
+    async def edit(self, nick=None, roles=None, **kwargs):
+        await asyncio.sleep(self.guild.latency)
+        self.nick = nick
+        if roles is not None:
+            self.roles = list(roles)
+
+    async def add_roles(self, *roles, **kwargs):
+        await asyncio.sleep(self.guild.latency)
+        self.roles.extend(roles)
+
+    async def send(self, *args, **kwargs):
+        await asyncio.sleep(self.guild.latency)
+
+class FakeGuild:
+    def __init__(self, guild_id, latency):
+        self.id = guild_id
+        self.latency = latency
+        self.members = {}
+        self.roles = {}
+        self.channels = {}
+        self.categories = {}
+        self.default_role = FakeRole(guild_id, '@everyone', self)
+        self.created_roles = []
+        self.created_channels = []
+
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+
+    def get_role(self, role_id):
+        return self.roles.get(role_id)
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id) or self.categories.get(channel_id)
+
+    async def create_role(self, name=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        role = FakeRole(next(ids), name, self)
+        self.roles[role.id] = role
+        self.created_roles.append(role)
+        return role
+
+    async def create_text_channel(self, name, category=None, overwrites=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        channel = fake_text_channel_class()(next(ids), name, self.latency)
+        channel.guild = self
+        channel.category_id = category.id if category else None
+        self.channels[channel.id] = channel
+        self.created_channels.append(channel)
+        return channel
+
+    async def fetch_member(self, member_id):
+        await asyncio.sleep(self.latency)
+        return self.members[member_id]
+
+class FakeResponse:
+    def __init__(self, latency):
+        self.latency = latency
+        self.done = False
+        self.acknowledged_at = None  # When Discord would have seen the first response or defer
+        self.content = None
+
+    def is_done(self):
+        return self.done
+
+    async def acknowledge(self):
+        self.done = True
+        await asyncio.sleep(self.latency)
+        self.acknowledged_at = time.perf_counter()
+
+    async def send_message(self, content=None, **kwargs):
+        self.content = content
+        await self.acknowledge()
+
+    async def send_modal(self, modal):
+        await self.acknowledge()
+
+    async def defer(self, *args, **kwargs):
+        await self.acknowledge()
+
+class FakeInteraction:
+    def __init__(self, client, guild, user, message=None):
+        self.client = client
+        self.guild = guild
+        self.user = user
+        self.message = message
+        self.response = FakeResponse(guild.latency)
+
+    async def edit_original_response(self, **kwargs):
+        await asyncio.sleep(self.guild.latency)
+
+class FakeContext:
+    def __init__(self, client, guild, author):
+        self.bot = client
+        self.guild = guild
+        self.author = author
+        self.interaction = FakeInteraction(client, guild, author)
+        self.response = self.interaction.response
+        self.responses = []  # (content, kwargs) of each respond
+
+    async def respond(self, *args, **kwargs):
+        self.responses.append((args[0] if args else kwargs.get('content'), kwargs))
+        # Like py-cord, a response after a defer goes out as a followup
+        if self.response.is_done():
+            await asyncio.sleep(self.guild.latency)
+        else:
+            await self.response.send_message(*args, **kwargs)
+
+    async def defer(self, *args, **kwargs):
+        await self.response.defer(*args, **kwargs)
+
+# Workload
+
+def synthetic_schedules(count, rng):
+    def period():
+        start = rng.randrange(0, 24 * 60, 15)
+        end = (start + rng.randrange(60, 10 * 60, 15)) % (24 * 60)
+        return [f"{start // 60:02d}:{start % 60:02d}", f"{end // 60:02d}:{end % 60:02d}"]
+    schedules = [{'username': f"player{i}", 'schedule': {day: [period() for _ in range(rng.randrange(0, 3))] for day in WEEKDAYS}} for i in range(count)]
+    today = datetime.utcnow()
+    absences = [{'username': f"player{i}", 'absences': {(today + timedelta(days=rng.randrange(14))).strftime('%m/%d'): [period()]}}
+                for i in rng.sample(range(count), count // 10)]
+    return schedules, absences
+
+def alliance_tag(index):
+    # Distinct three-letter tags, the most the modal accepts
+    return ''.join(chr(ord('A') + index // 26 ** place % 26) for place in (2, 1, 0))
+
+def synthetic_events(count, rate, rng):
+    # Joins first fill the barricade; the rest mix registrations, unlocks and availability polls
+    mix = [('member_join', 35), ('member_update', 15), ('unlock', 20), ('days_modal', 20), ('follow_up', 5),
+           ('poll_availability', 4), ('poll_availability_day', 3), ('poll_availability_week', 1), ('best_window', 2)]
+    types, weights = zip(*mix)
+    joined = []
+    events = []
+    for index in range(count):
+        kind = rng.choices(types, weights)[0] if joined else 'member_join'
+        event = {'t': round(index / rate, 4), 'type': kind}
+        if kind == 'member_join':
+            event['member'] = len(joined)
+            joined.append(event['member'])
+        elif kind in ('member_update', 'unlock', 'days_modal'):
+            event['member'] = rng.choice(joined)
+            if kind == 'days_modal':
+                event['speedup_type'] = rng.choice(['troops', 'research', 'construction'])
+                event['days'] = rng.randrange(1, 500)
+        elif kind == 'follow_up':
+            event['member'] = rng.choice(joined)
+            event['choice'] = rng.choice(['FEL', 'FEL Academy', 'Another Alliance', 'Another State'])
+            if event['choice'] in ('Another Alliance', 'Another State'):
+                event['alliance'] = alliance_tag(rng.randrange(40))
+            if event['choice'] == 'Another State':
+                event['state'] = str(rng.choice([101, 454, 1022]))
+        elif kind == 'poll_availability':
+            event['day'] = rng.choice(WEEKDAYS)
+        elif kind == 'best_window':
+            event['when'] = rng.choice(WEEKDAYS)
+            event['length'] = rng.choice([30, 60, 120])
+        elif kind in ('poll_availability_day', 'poll_availability_week'):
+            event['date'] = (datetime.utcnow() + timedelta(days=rng.randrange(14))).strftime('%m/%d')
+        events.append(event)
+    return events
+
+class StallMonitor:
+    # Samples the loop on a short timer; anything beyond the timer is time the loop was blocked
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.lags = []
+
+    async def run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - expected))
+
+    def report(self):
+        lags = sorted(self.lags)
+        if not lags:
+            return {}
+        return {'samples': len(lags), 'total_stall_s': round(sum(lag for lag in lags if lag > 0.001), 3),
+                'p99_ms': round(1000 * percentile(lags, 0.99), 2), 'max_ms': round(1000 * lags[-1], 2)}
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+class Replay:
+    def __init__(self, felv2, latency):
+        self.felv2 = felv2
+        self.bot = felv2.bot
+        self.config = felv2.config
+        self.guild = FakeGuild(felv2.ALLIANCE_ID, latency)
+        for role_id in itertools.chain([self.config.leadership_role_id], self.config.registration_role_ids, *self.config.choice_role_ids.values()):
+            self.guild.roles[role_id] = FakeRole(role_id, f"role-{role_id}")
+        for channel_id, name in ((self.config.logs_channel_id, 'logs'), (self.config.barricade_channel_id, 'barricade'), (self.config.speedup_log_channel_id, 'speedups')):
+            self.guild.channels[channel_id] = FakeChannel(channel_id, name, latency)
+        self.guild.categories[self.config.diplomacy_category_id] = FakeCategory(self.config.diplomacy_category_id, 'diplomacy')
+        self.bot.get_channel = self.guild.channels.get
+        self.members = {}  # event member index -> FakeMember
+        self.latencies = {}  # event type -> seconds
+        self.acknowledgements = {}  # event type -> seconds until the interaction was answered or deferred
+        self.errors = {}
+
+    def member(self, index):
+        if index not in self.members:
+            member = FakeMember(self.guild, next(ids), f"member{index}")
+            self.members[index] = member
+            self.guild.members[member.id] = member
+        return self.members[index]
+
+    async def invoke(self, command, member, *args):
+        # Slash commands go through the interaction scheduler, as they do in the bot
+        ctx = FakeContext(self.bot, self.guild, member)
+        ctx.command = command
+        async with self.felv2.interaction_scheduler.slot(ctx):
+            await command.callback(ctx, *args)
+        return ctx.interaction
+
+    async def dispatch(self, event):
+        # Returns the interaction for interaction events, so its acknowledgement time can be measured
+        felv2 = self.felv2
+        kind = event['type']
+        member = self.member(event['member']) if 'member' in event else self.member(-1)
+        if kind == 'member_join':
+            await felv2.on_member_join(member)
+        elif kind == 'member_update':
+            before = member.copy()
+            member.roles.append(self.guild.roles[next(iter(self.config.registration_role_ids))])
+            await felv2.on_member_update(before, member)
+        elif kind == 'unlock':
+            message_ids = felv2.associations.messages_for(member.id)
+            message = FakeMessage(self.guild.channels[self.config.barricade_channel_id])
+            if message_ids:
+                message.id = next(iter(message_ids))
+            interaction = FakeInteraction(self.bot, self.guild, member, message)
+            await felv2.UnlockButton().callback(interaction)
+            return interaction
+        elif kind == 'days_modal':
+            modal = felv2.DaysModal(speedup_type=event['speedup_type'], title="Register Speedups")
+            modal.children[0].value = str(event['days'])
+            interaction = FakeInteraction(self.bot, self.guild, member)
+            await modal.callback(interaction)
+            return interaction
+        elif kind == 'follow_up':
+            # The registration details modal; other alliances and states get a diplomacy role and channel
+            modal = felv2.FollowUpModal(event['choice'])
+            fields = {'alliance': event.get('alliance', ''), 'state': event.get('state', ''), 'ingame_name': event.get('name', f"player{event['member']}")}
+            for item in modal.children:
+                item.value = fields[item.custom_id]
+            interaction = FakeInteraction(self.bot, self.guild, member)
+            await modal.callback(interaction)
+            return interaction
+        elif kind == 'poll_availability':
+            return await self.invoke(felv2.poll_availability, member, event['day'], event.get('renderer'))
+        elif kind == 'poll_availability_day':
+            return await self.invoke(felv2.poll_availability_day, member, event.get('date'), event.get('renderer'))
+        elif kind == 'poll_availability_week':
+            return await self.invoke(felv2.poll_availability_week, member, event.get('date'), event.get('renderer'))
+        elif kind == 'best_window':
+            return await self.invoke(felv2.best_window, member, event['when'], event.get('length', 60), 1, 5)
+        else:
+            raise ValueError(f"Unknown event type {kind}")
+
+    async def timed_dispatch(self, event):
+        started = time.perf_counter()
+        interaction = None
+        try:
+            interaction = await self.dispatch(event)
+        except Exception as e:
+            self.errors.setdefault(event['type'], []).append(repr(e))
+        self.latencies.setdefault(event['type'], []).append(time.perf_counter() - started)
+        if interaction is not None and interaction.response.acknowledged_at is not None:
+            self.acknowledgements.setdefault(event['type'], []).append(interaction.response.acknowledged_at - started)
+
+    async def run(self, events, speed):
+        monitor = StallMonitor()
+        monitor_task = asyncio.create_task(monitor.run())
+        started = time.perf_counter()
+        tasks = []
+        # Open-loop replay: each event starts at its own timestamp, whether or not earlier ones finished
+        for event in events:
+            delay = event.get('t', 0) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self.timed_dispatch(event)))
+        await asyncio.gather(*tasks)
+
+        # Let the join pipeline and log sink drain so their work counts towards the run
+        while self.felv2.join_pipeline.queue.qsize() or self.felv2.log_sink.buffer or self.felv2.speedup_log_sink.buffer:
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - started
+        monitor_task.cancel()
+        return self.report(elapsed, monitor)
+
+    def report(self, elapsed, monitor):
+        events = sum(len(samples) for samples in self.latencies.values())
+        report = {'events': events, 'elapsed_s': round(elapsed, 3), 'throughput_per_s': round(events / elapsed, 1) if elapsed else 0.0,
+                  'handlers': {}, 'loop_stall': monitor.report(),
+                  'join_pipeline': self.felv2.join_pipeline.stats(), 'log_sink': self.felv2.log_sink.stats(),
+                  'speedup_log_sink': self.felv2.speedup_log_sink.stats(),
+                  'render_cache': self.felv2.render_cache.stats(),
+                  'interaction_scheduler': self.felv2.interaction_scheduler.stats(),
+                  'messages_sent': {channel.name: channel.sent for channel in self.guild.channels.values()}}
+        for kind, samples in sorted(self.latencies.items()):
+            samples = sorted(samples)
+            report['handlers'][kind] = {'count': len(samples), 'p50_ms': round(1000 * percentile(samples, 0.5), 2),
+                                        'p99_ms': round(1000 * percentile(samples, 0.99), 2), 'max_ms': round(1000 * samples[-1], 2),
+                                        'errors': len(self.errors.get(kind, []))}
+            acknowledgements = sorted(self.acknowledgements.get(kind, []))
+            if acknowledgements:
+                report['handlers'][kind].update({'ack_p99_ms': round(1000 * percentile(acknowledgements, 0.99), 2),
+                                                 'ack_over_3s': sum(seconds > 3 for seconds in acknowledgements)})
+        return report
+
+def print_report(report, errors):
+    print(f"{report['events']} events in {report['elapsed_s']}s ({report['throughput_per_s']}/s)")
+    print(f"{'event':<24}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}{'ack p99':>10}{'ack >3s':>9}")
+    for kind, row in report['handlers'].items():
+        print(f"{kind:<24}{row['count']:>8}{row['p50_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}{row['errors']:>8}"
+              f"{row.get('ack_p99_ms', '-'):>10}{row.get('ack_over_3s', '-'):>9}")
+    print(f"loop stall: {report['loop_stall']}")
+    for name in ('join_pipeline', 'log_sink', 'speedup_log_sink', 'render_cache', 'interaction_scheduler', 'messages_sent'):
+        print(f"{name}: {report[name]}")
+    for kind, messages in errors.items():
+        print(f"first {kind} error: {messages[0]}")
+
+def benchmark_counts(seed):
+    # A day and a week of per-minute head-counts from a few hundred random shifts
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    minutes = np.arange(24 * 60)
+
+    def day():
+        starts, lengths = rng.integers(0, 24 * 60, 300), rng.integers(30, 480, 300)
+        return ((minutes[None, :] - starts[:, None]) % (24 * 60) < lengths[:, None]).sum(axis=0)
+
+    return day(), np.stack([day() for _ in range(7)])
+
+def benchmark_backend(backend, renders, seed, results):
+    # Runs in its own interpreter so the peak RSS belongs to this backend alone
+    os.environ['RENDER_WORKERS'] = '1'
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import felv2
+    day, week = benchmark_counts(seed)
+    labels = [f"{weekday.capitalize()} 01/{index + 1:02d}" for index, weekday in enumerate(WEEKDAYS)]
+    render_day, render_week = felv2.CHART_RENDERERS[backend]['availability'], felv2.CHART_RENDERERS[backend]['week']
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    started = time.perf_counter()
+    png = render_day(day)
+    cold = time.perf_counter() - started
+    with open(f"chart-{backend}-day.png", 'wb') as f:
+        f.write(png)
+    with open(f"chart-{backend}-week.png", 'wb') as f:
+        f.write(render_week(week, labels))
+
+    timings = {'day': [], 'week': []}
+    for _ in range(renders):
+        for chart, render, args in (('day', render_day, (day,)), ('week', render_week, (week, labels))):
+            started = time.perf_counter()
+            size = len(render(*args))
+            timings[chart].append(time.perf_counter() - started)
+    felv2.chart_renderer.shutdown()
+    results.put({'backend': backend, 'cold_ms': round(1000 * cold, 1),
+                 'day_p50_ms': round(1000 * statistics.median(timings['day']), 2),
+                 'week_p50_ms': round(1000 * statistics.median(timings['week']), 2),
+                 'day_png_kb': round(len(png) / 1024, 1), 'week_png_kb': round(size / 1024, 1),
+                 'peak_rss_mb': round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024, 1)})
+
+def chart_benchmark(backends, renders, seed):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    rows = []
+    for backend in backends:
+        process = context.Process(target=benchmark_backend, args=(backend, renders, seed, results))
+        process.start()
+        rows.append(results.get())
+        process.join()
+    print(f"{'backend':<12}{'cold ms':>10}{'day p50':>10}{'week p50':>10}{'day KB':>9}{'week KB':>9}{'peak RSS MB':>13}")
+    for row in rows:
+        print(f"{row['backend']:<12}{row['cold_ms']:>10}{row['day_p50_ms']:>10}{row['week_p50_ms']:>10}{row['day_png_kb']:>9}{row['week_png_kb']:>9}{row['peak_rss_mb']:>13}")
+    print(f"sample charts written to {os.getcwd()}")
+    return rows
+
+def import_felv2(workdir, prefix):
+    # felv2 keeps its state files in the working directory and reads its IDs from the environment
+    os.chdir(workdir or tempfile.mkdtemp(prefix=prefix))
+    for name, value in REPLAY_ENV.items():
+        os.environ.setdefault(name, value)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import felv2
+    return felv2
+
+def s3_benchmark(felv2, user_counts, latency, rng):
+    rows = []
+    for users in user_counts:
+        s3 = FakeS3(latency)
+        schedules, absences = synthetic_schedules(users, rng)
+        for index, schedule in enumerate(schedules):
+            s3.put(f"schedules/{index}.json", schedule)
+        for index, absence in enumerate(absences):
+            s3.put(f"absences/{index}.json", absence)
+        felv2.s3_client = lambda: s3
+        felv2.s3_object_cache.clear()
+
+        row = {'users': users, 'objects': len(s3.objects)}
+        for phase in ('cold', 'warm', 'warm_1pct_changed'):
+            if phase == 'warm_1pct_changed':
+                for index in rng.sample(range(users), max(1, users // 100)):
+                    s3.put(f"schedules/{index}.json", schedules[index])
+            gets = s3.gets
+            started = time.perf_counter()
+            for prefix in ('schedules/', 'absences/'):
+                felv2.sync_s3_prefix(prefix)
+            row[f'{phase}_ms'] = round(1000 * (time.perf_counter() - started), 1)
+            row[f'{phase}_gets'] = s3.gets - gets
+        rows.append(row)
+
+    print(f"{'users':>6}{'objects':>9}{'cold ms':>10}{'gets':>7}{'warm ms':>10}{'gets':>7}{'1% ms':>10}{'gets':>7}")
+    for row in rows:
+        print(f"{row['users']:>6}{row['objects']:>9}{row['cold_ms']:>10}{row['cold_gets']:>7}{row['warm_ms']:>10}{row['warm_gets']:>7}"
+              f"{row['warm_1pct_changed_ms']:>10}{row['warm_1pct_changed_gets']:>7}")
+    print(f"S3 stand-in latency {1000 * latency:g} ms per request, {felv2.S3_MAX_WORKERS} download threads")
+    return rows
+
+def window_benchmark(felv2, user_counts, rng, repeats=50):
+    rows = []
+    for users in user_counts:
+        s3 = FakeS3()
+        schedules, absences = synthetic_schedules(users, rng)
+        for index, schedule in enumerate(schedules):
+            s3.put(f"schedules/{index}.json", schedule)
+        for index, absence in enumerate(absences):
+            s3.put(f"absences/{index}.json", absence)
+        felv2.s3_client = lambda: s3
+        felv2.s3_object_cache.clear()
+
+        # A matrix per size, so each run starts from an empty snapshot
+        matrix = felv2.AvailabilityMatrix(f"windows-{users}.npy", f"windows-{users}.json")
+        started = time.perf_counter()
+        matrix.refresh()
+        felv2.sync_s3_prefix('absences/')
+        build_ms = 1000 * (time.perf_counter() - started)
+
+        date = datetime.utcnow()
+        day = WEEKDAYS[date.weekday()]
+        counts_ms, windows_ms = [], []
+        for index in range(repeats):
+            started = time.perf_counter()
+            counts = matrix.day_counts(day, date)
+            counted = time.perf_counter()
+            felv2.best_windows(counts, (30, 60, 120, 240)[index % 4], 1, 5)
+            counts_ms.append(1000 * (counted - started))
+            windows_ms.append(1000 * (time.perf_counter() - counted))
+        counts_ms.sort()
+        windows_ms.sort()
+        rows.append({'users': users, 'build_ms': round(build_ms, 1),
+                     'counts_p50_ms': round(percentile(counts_ms, 0.5), 2), 'counts_p99_ms': round(percentile(counts_ms, 0.99), 2),
+                     'windows_p50_ms': round(percentile(windows_ms, 0.5), 2), 'windows_p99_ms': round(percentile(windows_ms, 0.99), 2)})
+
+    print(f"{'users':>6}{'build ms':>10}{'counts p50':>12}{'p99':>8}{'windows p50':>13}{'p99':>8}")
+    for row in rows:
+        print(f"{row['users']:>6}{row['build_ms']:>10}{row['counts_p50_ms']:>12}{row['counts_p99_ms']:>8}"
+              f"{row['windows_p50_ms']:>13}{row['windows_p99_ms']:>8}")
+    print(f"times in ms over {repeats} queries; windows of 30, 60, 120 and 240 minutes, top 5")
+    return rows
+
+def over_budget(times, rate, per, slack=0.002):
+    # Sends that found the token bucket empty: replay them against a bucket of `rate` tokens that
+    # refills over `per` seconds. A send stamped up to `slack` seconds early still counts as on time,
+    # since a timer wakeup or a GC pause can land between taking the token and stamping the send
+    tokens, last, over = float(rate), None, 0
+    for sent in sorted(times):
+        if last is not None:
+            tokens = min(rate, tokens + (sent - last) * rate / per)
+        last = sent
+        if tokens < 1 - slack * rate / per:
+            over += 1
+        else:
+            tokens -= 1
+    return over
+
+def join_burst(felv2, joins, latency):
+    # Every join arrives at once, as after a state transfer; measured until the last welcome and log message is out
+    async def burst():
+        felv2.associations.load()
+        replay = Replay(felv2, latency)
+        members = [replay.member(index) for index in range(joins)]
+        started = time.monotonic()
+        for member in members:
+            await felv2.on_member_join(member)
+        while felv2.join_pipeline.processed < joins or felv2.log_sink.buffer:
+            await asyncio.sleep(0.01)
+        elapsed = time.monotonic() - started
+
+        channels = list(replay.guild.channels.values())
+        budget = {channel.name: over_budget(channel.sent_at, felv2.channel_limiters[channel.id].rate, felv2.channel_limiters[channel.id].per)
+                  for channel in channels if channel.sent_at}
+        budget['global'] = over_budget([sent for channel in channels for sent in channel.sent_at], felv2.global_limiter.rate, felv2.global_limiter.per)
+        return {'joins': joins, 'elapsed_s': round(elapsed, 3), **felv2.join_pipeline.stats(),
+                'associated': sum(bool(felv2.associations.messages_for(member.id)) for member in members),
+                'messages_sent': {channel.name: channel.sent for channel in channels if channel.sent},
+                'over_budget': budget}
+    try:
+        return asyncio.run(burst())
+    finally:
+        felv2.associations.close()
+
+def join_burst_benchmark(felv2, joins, latency):
+    row = join_burst(felv2, joins, latency)
+    print(f"{row['joins']} joins in {row['elapsed_s']}s: {row['batches']} batches, latency avg {row['avg_latency_s']}s "
+          f"max {row['max_latency_s']}s, {row['associated']} members associated")
+    print(f"messages sent: {row['messages_sent']}, sends over the rate-limit budget: {row['over_budget']}")
+    return row
+
+class ListAssociations:
+    # The original storage: a list of (message_id, member_id) tuples, scanned on every lookup and
+    # rewritten to JSON in full, on the event loop, after every change
+    def __init__(self, path):
+        self.path = path
+        self.pairs = []
+
+    def load(self):
+        with open(self.path, 'r') as f:
+            self.pairs = [tuple(pair) for pair in json.load(f)]
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump([list(pair) for pair in self.pairs], f)
+
+    def add(self, message_id, member_id):
+        self.pairs.append((message_id, member_id))
+        self.save()
+
+    def remove(self, message_id, member_id):
+        self.pairs.remove((message_id, member_id))
+        self.save()
+
+    def member_for(self, message_id):
+        return next((member_id for m_id, member_id in self.pairs if m_id == message_id), None)
+
+    def message_for(self, member_id):
+        return next((message_id for message_id, m_id in self.pairs if m_id == member_id), None)
+
+def association_benchmark(felv2, size, lookups=500, writes=50):
+    rng = random.Random(1)
+    pairs = [[1_000_000 + index, 5_000_000 + index] for index in range(size)]
+    sample = [rng.choice(pairs) for _ in range(lookups)]
+    fresh = [[9_000_000 + index, 9_500_000 + index] for index in range(writes)]
+
+    def per_call_us(func, args):
+        started = time.perf_counter()
+        for arg in args:
+            func(*arg)
+        return round(1e6 * (time.perf_counter() - started) / len(args), 1)
+
+    with open('associations-list.json', 'w') as f:
+        json.dump(pairs, f)
+    old = ListAssociations('associations-list.json')
+    started = time.perf_counter()
+    old.load()
+    row = {'impl': 'list', 'load_ms': round(1000 * (time.perf_counter() - started), 1),
+           'by_message_us': per_call_us(old.member_for, [(message_id,) for message_id, _ in sample]),
+           'by_member_us': per_call_us(old.message_for, [(member_id,) for _, member_id in sample]),
+           'write_on_loop_us': per_call_us(lambda *pair: (old.add(*pair), old.remove(*pair)), fresh) / 2,
+           'persist_ms': None}
+    rows = [row]
+
+    async def index_run():
+        shutil.copy('associations-list.json', 'associations-index.json')
+        index = felv2.AssociationIndex('associations-index.json', 'associations-index.journal')
+        started = time.perf_counter()
+        index.load()
+        row = {'impl': 'index', 'load_ms': round(1000 * (time.perf_counter() - started), 1),
+               'by_message_us': per_call_us(index.members_for, [(message_id,) for message_id, _ in sample]),
+               'by_member_us': per_call_us(index.messages_for, [(member_id,) for _, member_id in sample]),
+               'write_on_loop_us': per_call_us(lambda *pair: (index.add(*pair), index.remove(*pair)), fresh) / 2}
+        # What the maintenance task does with the batch: one journal write and fsync off the loop
+        started = time.perf_counter()
+        await index.flush()
+        row['persist_ms'] = round(1000 * (time.perf_counter() - started), 1)
+        started = time.perf_counter()
+        await asyncio.get_running_loop().run_in_executor(None, index.compact, index.pairs())
+        row['compact_ms'] = round(1000 * (time.perf_counter() - started), 1)
+        index.close()
+        return row
+    rows.append(asyncio.run(index_run()))
+
+    print(f"{size} associations, {lookups} lookups, {writes} adds and removes")
+    print(f"{'impl':<7}{'load ms':>9}{'by message us':>15}{'by member us':>14}{'write us':>10}{'persist ms':>12}")
+    for row in rows:
+        print(f"{row['impl']:<7}{row['load_ms']:>9}{row['by_message_us']:>15}{row['by_member_us']:>14}{row['write_on_loop_us']:>10}"
+              f"{row['persist_ms'] if row['persist_ms'] is not None else '-':>12}")
+    print(f"list writes rewrite the whole file on the loop; index writes are batched, "
+          f"one flush of {2 * writes} entries took {rows[1]['persist_ms']} ms off the loop, a full compaction {rows[1]['compact_ms']} ms")
+    return rows
+
+def alliance_load(felv2, alliances, per_alliance, latency):
+    # Every member of every alliance submits the details modal at once, so each alliance's first
+    # submits race to provision its diplomacy role and channel
+    async def load():
+        replay = Replay(felv2, latency)
+        events = []
+        for index in range(alliances):
+            state = str(100 + index % 900) if index % 2 else ''
+            for submit in range(per_alliance):
+                events.append({'type': 'follow_up', 'member': len(events), 'choice': 'Another State' if state else 'Another Alliance',
+                               'alliance': alliance_tag(index), 'state': state})
+        for event in events:
+            replay.member(event['member'])
+        latencies = []
+        async def submit(event):
+            started = time.perf_counter()
+            interaction = await replay.dispatch(event)
+            latencies.append(time.perf_counter() - started)
+            return interaction
+        started = time.perf_counter()
+        interactions = await asyncio.gather(*(submit(event) for event in events))
+        elapsed = time.perf_counter() - started
+
+        guild = replay.guild
+        latencies.sort()
+        role_names = [role.name for role in guild.created_roles]
+        channel_names = [channel.name for channel in guild.created_channels]
+        welcomes = {channel.name: [message.kwargs['embed'].title for message in channel.messages.values()] for channel in guild.created_channels}
+        members_with_role = sum(any(role in guild.created_roles for role in member.roles) for member in replay.members.values())
+        return {'alliances': alliances, 'submits': len(events), 'elapsed_s': round(elapsed, 3),
+                'p50_ms': round(1000 * percentile(latencies, 0.5), 1), 'p99_ms': round(1000 * percentile(latencies, 0.99), 1),
+                'roles_created': len(role_names), 'duplicate_roles': len(role_names) - len(set(role_names)),
+                'channels_created': len(channel_names), 'duplicate_channels': len(channel_names) - len(set(channel_names)),
+                'first_welcomes': sum(titles.count("A Warm Welcome!") for titles in welcomes.values()),
+                'welcomes': sum(len(titles) for titles in welcomes.values()), 'members_with_role': members_with_role,
+                'errors': sum(interaction.response.content == "An error occurred processing your request." for interaction in interactions),
+                'over_budget': over_budget([sent for channel in guild.created_channels for sent in channel.sent_at],
+                                           felv2.global_limiter.rate, felv2.global_limiter.per)}
+    return asyncio.run(load())
+
+def alliance_load_benchmark(felv2, alliances, per_alliance, latency):
+    row = alliance_load(felv2, alliances, per_alliance, latency)
+    print(f"{row['submits']} details modals from {row['alliances']} alliances in {row['elapsed_s']}s, p50 {row['p50_ms']} ms p99 {row['p99_ms']} ms")
+    print(f"roles created {row['roles_created']} ({row['duplicate_roles']} duplicates), channels created {row['channels_created']} "
+          f"({row['duplicate_channels']} duplicates), first-member welcomes {row['first_welcomes']} of {row['welcomes']}, "
+          f"{row['members_with_role']} members given their alliance role, {row['errors']} errors, {row['over_budget']} sends over the global budget")
+    if row['duplicate_roles'] or row['duplicate_channels'] or row['errors'] or row['roles_created'] != alliances:
+        raise SystemExit("Alliance provisioning was not single-flight")
+    return row
+
+def week_heatmap_check(felv2, users, renders, latency, rng):
+    # Calls /poll-availability-week without the scheduler in front, as an interaction answered
+    # directly, so every render runs against WEEK_HEATMAP_BUDGET_SECONDS
+    s3 = FakeS3()
+    schedules, absences = synthetic_schedules(users, rng)
+    for index, schedule in enumerate(schedules):
+        s3.put(f"schedules/{index}.json", schedule)
+    for index, absence in enumerate(absences):
+        s3.put(f"absences/{index}.json", absence)
+    felv2.s3_client = lambda: s3
+
+    async def check():
+        replay = Replay(felv2, latency)
+        await felv2.availability_matrix.catch_up_async()  # As on_ready does before the first command
+        today = datetime.utcnow()
+        times, fallbacks = [], 0
+        for index in range(renders):
+            ctx = FakeContext(felv2.bot, replay.guild, replay.member(index))
+            started = time.perf_counter()
+            await felv2.poll_availability_week.callback(ctx, (today + timedelta(days=index % 14)).strftime('%m/%d'), None)
+            times.append(time.perf_counter() - started)
+            fallbacks += any('file' not in kwargs for _, kwargs in ctx.responses)
+        times.sort()
+        return {'users': users, 'renders': renders, 'budget_s': felv2.WEEK_HEATMAP_BUDGET_SECONDS,
+                'p50_ms': round(1000 * percentile(times, 0.5), 1), 'p99_ms': round(1000 * percentile(times, 0.99), 1),
+                'max_ms': round(1000 * times[-1], 1), 'over_budget': fallbacks}
+    return asyncio.run(check())
+
+def week_heatmap_check_benchmark(felv2, users, renders, latency, rng):
+    row = week_heatmap_check(felv2, users, renders, latency, rng)
+    print(f"{row['renders']} week heatmaps for {row['users']} members: p50 {row['p50_ms']} ms, p99 {row['p99_ms']} ms, "
+          f"max {row['max_ms']} ms against a {row['budget_s']}s budget")
+    if row['over_budget']:
+        raise SystemExit(f"{row['over_budget']} of {row['renders']} week heatmaps exceeded the {row['budget_s']}s budget")
+    return row
+
+def json_set_days(member_id, speedup_type, days):
+    # The original DaysModal write: load the type's JSON registry, set one member, rewrite it, all on the loop
+    filename = f"register-{speedup_type}.json"
+    if os.path.exists(filename):
+        with open(filename, "r") as file:
+            registry = json.load(file)
+    else:
+        registry = {}
+    registry[str(member_id)] = days
+    with open(filename, "w") as file:
+        json.dump(registry, file)
+
+def registry_benchmark(felv2, submitters, per_submitter=20, registered=5000):
+    rng = random.Random(1)
+    existing = [(member_id, speedup_type, rng.randrange(1, 500), time.time())
+                for member_id in range(registered) for speedup_type in felv2.SPEEDUP_TYPES]
+    # Each submitter owns its members, so the last value it wrote is the one that must stick
+    plans = [[(1_000_000 + 1000 * submitter + rng.randrange(50), rng.choice(felv2.SPEEDUP_TYPES), rng.randrange(1, 1000))
+              for _ in range(per_submitter)] for submitter in range(submitters)]
+    expected = {(member_id, speedup_type): days for plan in plans for member_id, speedup_type, days in plan}
+
+    async def measure(impl, set_days):
+        monitor = StallMonitor()
+        monitor_task = asyncio.create_task(monitor.run())
+        latencies = []
+        async def submitter(plan):
+            for member_id, speedup_type, days in plan:
+                started = time.perf_counter()
+                await set_days(member_id, speedup_type, days)
+                latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0)
+        started = time.perf_counter()
+        await asyncio.gather(*(submitter(plan) for plan in plans))
+        elapsed = time.perf_counter() - started
+        monitor_task.cancel()
+        latencies.sort()
+        return {'impl': impl, 'submissions': len(latencies), 'elapsed_s': round(elapsed, 3),
+                'per_second': round(len(latencies) / elapsed), 'p50_ms': round(1000 * percentile(latencies, 0.5), 2),
+                'p99_ms': round(1000 * percentile(latencies, 0.99), 2), 'loop_stall_ms': monitor.report().get('max_ms', 0.0)}
+
+    async def json_run():
+        for speedup_type in felv2.SPEEDUP_TYPES:
+            with open(f"register-{speedup_type}.json", "w") as file:
+                json.dump({str(member_id): days for member_id, t, days, _ in existing if t == speedup_type}, file)
+        async def set_days(member_id, speedup_type, days):
+            json_set_days(member_id, speedup_type, days)
+        row = await measure('json', set_days)
+        registries = {}
+        for speedup_type in felv2.SPEEDUP_TYPES:
+            with open(f"register-{speedup_type}.json", "r") as file:
+                registries[speedup_type] = json.load(file)
+        row['lost'] = sum(registries[speedup_type].get(str(member_id)) != days for (member_id, speedup_type), days in expected.items())
+        for speedup_type in felv2.SPEEDUP_TYPES:
+            os.remove(f"register-{speedup_type}.json")
+        return row
+
+    async def sqlite_run():
+        registry = felv2.SpeedupRegistry('registry-benchmark.db')
+        registry.write_rows(existing)
+        for member_id, speedup_type, days, _ in existing:
+            registry.apply(member_id, speedup_type, days)
+        try:
+            row = await measure('sqlite', registry.set_days)
+            stored = {(member_id, speedup_type): days for member_id, speedup_type, days, _ in registry.changes_since(0)}
+            row['lost'] = sum(stored.get(key) != days or registry.leaderboards[key[1]].days.get(key[0]) != days
+                              for key, days in expected.items())
+        finally:
+            registry.close()
+        return row
+
+    rows = [asyncio.run(json_run()), asyncio.run(sqlite_run())]
+    print(f"{submitters} concurrent submitters x {per_submitter} submissions, {registered} members already registered per type")
+    print(f"{'impl':<8}{'per s':>8}{'p50 ms':>9}{'p99 ms':>9}{'loop stall ms':>15}{'lost':>6}")
+    for row in rows:
+        print(f"{row['impl']:<8}{row['per_second']:>8}{row['p50_ms']:>9}{row['p99_ms']:>9}{row['loop_stall_ms']:>15}{row['lost']:>6}")
+    if any(row['lost'] for row in rows):
+        raise SystemExit("Some submissions were not stored")
+    return rows
+
+def view_benchmark(felv2, counts):
+    # Memory the view store holds after sending N /registration menus, sending each one as a stored
+    # per-message view versus as felv2's view_template (registered once, never stored per message)
+    from discord.ui.view import ViewStore
+    state = felv2.bot._connection
+
+    async def measure(make_view, views):
+        state._view_store = ViewStore(state)
+        for view_class in felv2.PERSISTENT_VIEWS:
+            felv2.bot.add_view(view_class())
+        gc.collect()
+        tracemalloc.start()
+        for message_id in range(views):
+            view = make_view(page=message_id % 20 + 1)
+            if view.is_dispatchable():  # What Messageable.send does once the message exists
+                state.store_view(view, message_id)
+        del view
+        gc.collect()
+        held = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return len(state._view_store._views), held
+
+    rows = []
+    for views in counts:
+        for mode, make_view in (('per_message', felv2.SpeedupTypeView), ('template', lambda page: felv2.view_template(felv2.SpeedupTypeView, page=page))):
+            keys, held = asyncio.run(measure(make_view, views))
+            rows.append({'views': views, 'mode': mode, 'store_keys': keys, 'held_mb': round(held / 2 ** 20, 2)})
+
+    print(f"{'views':>7}  {'mode':<12}{'store keys':>11}{'held MB':>9}")
+    for row in rows:
+        print(f"{row['views']:>7}  {row['mode']:<12}{row['store_keys']:>11}{row['held_mb']:>9}")
+    return rows
+
+def run_benchmark(args, prefix, benchmark, *benchmark_args):
+    # Import felv2 into a scratch directory, run one benchmark, write its rows to --json if asked
+    felv2 = import_felv2(args.workdir, prefix)
+    try:
+        rows = benchmark(felv2, *benchmark_args)
+    finally:
+        felv2.chart_renderer.shutdown()
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded or synthetic events against felv2's handlers offline.")
+    parser.add_argument('--events', help="JSONL event stream to replay")
+    parser.add_argument('--synthetic', type=int, default=1000, help="Number of synthetic events when --events is not given")
+    parser.add_argument('--rate', type=float, default=100.0, help="Synthetic events per second")
+    parser.add_argument('--speed', type=float, default=1.0, help="Replay speed multiplier for event timestamps")
+    parser.add_argument('--schedules', type=int, default=300, help="Synthetic availability schedules in the S3 stand-in")
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="Simulated Discord API round trip")
+    parser.add_argument('--no-rate-limits', action='store_true', help="Lift the bot's own send rate limits")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workdir', help="Directory for the bot's state files (default: a fresh temporary directory)")
+    parser.add_argument('--write-events', help="Write the event stream to this JSONL file and exit")
+    parser.add_argument('--json', help="Also write the report to this file")
+    parser.add_argument('--chart-benchmark', type=int, metavar='RENDERS', help="Benchmark the chart backends with this many renders each and exit")
+    parser.add_argument('--s3-benchmark', action='store_true', help="Benchmark cold and warm S3 syncs at 50, 500 and 5000 users and exit")
+    parser.add_argument('--s3-latency-ms', type=float, default=10.0, help="Simulated S3 round trip for --s3-benchmark")
+    parser.add_argument('--window-benchmark', type=int, nargs='*', metavar='USERS',
+                        help="Benchmark /best-window's counts and window search at these member counts (default 1000 5000 10000) and exit")
+    parser.add_argument('--join-burst', type=int, nargs='?', const=500, metavar='JOINS',
+                        help="Replay a burst of simultaneous joins (default 500) and check the messages sent against the rate limits, then exit")
+    parser.add_argument('--association-benchmark', type=int, nargs='?', const=100_000, metavar='PAIRS',
+                        help="Compare the association index with the old list at this many associations (default 100000) and exit")
+    parser.add_argument('--alliance-load', type=int, nargs='?', const=300, metavar='ALLIANCES',
+                        help="Submit the details modal concurrently for this many new alliances (default 300) and check each got one role and channel, then exit")
+    parser.add_argument('--submits-per-alliance', type=int, default=3, help="Concurrent details modals per alliance for --alliance-load")
+    parser.add_argument('--week-heatmap-check', type=int, nargs='?', const=20, metavar='RENDERS',
+                        help="Render the week heatmap this many times (default 20) for --schedules members and fail if any render exceeds its budget")
+    parser.add_argument('--registry-benchmark', type=int, nargs='?', const=50, metavar='SUBMITTERS',
+                        help="Compare speedup registration throughput with the old JSON files at this many concurrent submitters (default 50) and exit")
+    parser.add_argument('--view-benchmark', type=int, nargs='*', metavar='VIEWS',
+                        help="Measure view store memory after sending this many menus (default 1000 10000) and exit")
+    args = parser.parse_args()
+
+    if args.chart_benchmark:
+        os.chdir(args.workdir or tempfile.mkdtemp(prefix='felv2-charts-'))
+        for name, value in REPLAY_ENV.items():
+            os.environ.setdefault(name, value)
+        rows = chart_benchmark(['matplotlib', 'raster'], args.chart_benchmark, args.seed)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(rows, f, indent=2)
+        return
+
+    rng = random.Random(args.seed)
+    if args.s3_benchmark:
+        return run_benchmark(args, 'felv2-s3-', s3_benchmark, [50, 500, 5000], args.s3_latency_ms / 1000, rng)
+    if args.window_benchmark is not None:
+        return run_benchmark(args, 'felv2-windows-', window_benchmark, args.window_benchmark or [1000, 5000, 10000], rng)
+    if args.join_burst:
+        return run_benchmark(args, 'felv2-joins-', join_burst_benchmark, args.join_burst, args.latency_ms / 1000)
+    if args.association_benchmark:
+        return run_benchmark(args, 'felv2-associations-', association_benchmark, args.association_benchmark)
+    if args.alliance_load:
+        return run_benchmark(args, 'felv2-alliances-', alliance_load_benchmark, args.alliance_load, args.submits_per_alliance, args.latency_ms / 1000)
+    if args.week_heatmap_check:
+        return run_benchmark(args, 'felv2-heatmap-', week_heatmap_check_benchmark, args.schedules, args.week_heatmap_check, args.latency_ms / 1000, rng)
+    if args.registry_benchmark:
+        return run_benchmark(args, 'felv2-registry-', registry_benchmark, args.registry_benchmark)
+    if args.view_benchmark is not None:
+        return run_benchmark(args, 'felv2-views-', view_benchmark, args.view_benchmark or [1000, 10000])
+
+    if args.events:
+        with open(args.events, 'r') as f:
+            events = [json.loads(line) for line in f if line.strip()]
+    else:
+        events = synthetic_events(args.synthetic, args.rate, rng)
+    if args.write_events:
+        with open(args.write_events, 'w') as f:
+            f.writelines(json.dumps(event) + '\n' for event in events)
+        return
+
+    felv2 = import_felv2(args.workdir, 'felv2-replay-')
+    s3, table = FakeS3(), FakeTable()
+    schedules, absences = synthetic_schedules(args.schedules, rng)
+    for index, schedule in enumerate(schedules):
+        s3.put(f"schedules/{index}.json", schedule)
+    for index, absence in enumerate(absences):
+        s3.put(f"absences/{index}.json", absence)
+    felv2.s3_client = lambda: s3
+    felv2.user_keys.table_factory = lambda: table
+    if args.no_rate_limits:
+        felv2.global_limiter.rate = felv2.global_limiter.tokens = 10 ** 9
+        felv2.channel_limiters.default_factory = lambda: felv2.RateLimiter(10 ** 9, 1)
+
+    async def replay():
+        felv2.associations.load()
+        replay = Replay(felv2, args.latency_ms / 1000)
+        try:
+            return await replay.run(events, args.speed), replay.errors
+        finally:
+            await felv2.log_sink.close()
+            await felv2.speedup_log_sink.close()
+
+    try:
+        report, errors = asyncio.run(replay())
+    finally:
+        felv2.chart_renderer.shutdown()
+        felv2.speedup_registry.close()
+        felv2.associations.close()
+    print_report(report, errors)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
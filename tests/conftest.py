@@ -0,0 +1,13 @@
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import replay
+
+@pytest.fixture(scope='session')
+def felv2(tmp_path_factory):
+    # felv2 reads its IDs from the environment and keeps its state files in the working directory
+    module = replay.import_felv2(str(tmp_path_factory.mktemp('felv2')), 'felv2-tests-')
+    yield module
+    module.chart_renderer.shutdown()
@@ -0,0 +1,19 @@
+import pytest
+
+pytest.importorskip('discord')
+import replay
+
+def test_concurrent_details_modals_provision_each_alliance_once(felv2, monkeypatch):
+    # Every welcome goes through the global bucket; on a tenth of the time scale the 600 drain in about
+    # 1.3s. Much faster and timer jitter alone is worth whole tokens, so the budget check gets noisy
+    monkeypatch.setattr(felv2, 'global_limiter', felv2.RateLimiter(45, 0.1))
+    monkeypatch.setattr(felv2, 'guild_index', felv2.GuildIndex())
+
+    row = replay.alliance_load(felv2, 200, 3, 0.001)
+    assert row['errors'] == 0
+    assert row['roles_created'] == row['channels_created'] == 200
+    assert row['duplicate_roles'] == row['duplicate_channels'] == 0
+    # The first submit to reach each new channel gets the first-member welcome, the others the standard one
+    assert row['first_welcomes'] == 200 and row['welcomes'] == 600
+    assert row['members_with_role'] == 600
+    assert row['over_budget'] == 0
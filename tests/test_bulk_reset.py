@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('discord')
+import replay
+
+def run(felv2, job, post_barricade, monkeypatch):
+    guild = replay.FakeGuild(felv2.ALLIANCE_ID, 0)
+    for member_id in job.pending | job.reset:
+        guild.members[member_id] = replay.FakeMember(guild, member_id, f"member{member_id}")
+    channel = replay.FakeChannel(felv2.config.barricade_channel_id, 'barricade', 0)
+    monkeypatch.setattr(felv2.bot, 'get_channel', lambda channel_id: channel)
+    monkeypatch.setattr(felv2, 'post_barricade', post_barricade)
+    ctx = replay.FakeContext(felv2.bot, guild, replay.FakeMember(guild, 1, 'leader'))
+    asyncio.run(felv2.run_bulk_reset(ctx, job))
+
+def test_resume_after_a_crash_during_the_barricade_does_not_post_it_again(felv2, monkeypatch):
+    posted = []
+    async def crash_while_posting(channel, members):
+        posted.append(sorted(member.id for member in members))
+        raise RuntimeError("process killed")
+    with pytest.raises(RuntimeError):
+        run(felv2, felv2.BulkResetJob(felv2.ALLIANCE_ID, [101, 102, 103]), crash_while_posting, monkeypatch)
+    assert posted == [[101, 102, 103]]
+
+    job = felv2.BulkResetJob.load()
+    assert job.barricade_posted and job.reset == {101, 102, 103}
+    async def post(channel, members):
+        posted.append(sorted(member.id for member in members))
+    run(felv2, job, post, monkeypatch)
+    assert posted == [[101, 102, 103]]
+    assert felv2.BulkResetJob.load() is None
+
+def test_resume_before_the_barricade_posts_it_once(felv2, monkeypatch):
+    felv2.BulkResetJob(felv2.ALLIANCE_ID, [201], reset=[202]).save()
+    posted = []
+    async def post(channel, members):
+        posted.append(sorted(member.id for member in members))
+    run(felv2, felv2.BulkResetJob.load(), post, monkeypatch)
+    assert posted == [[201, 202]]
+    assert felv2.BulkResetJob.load() is None
@@ -0,0 +1,19 @@
+import asyncio, os
+
+from concurrent.futures.process import BrokenProcessPool
+
+def test_concurrent_failures_from_a_dead_worker_restart_the_pool_once(felv2):
+    async def scenario():
+        renderer = felv2.ChartRenderer(1, 4)
+        broken = renderer.executor
+        try:
+            # The worker exits under the first render, so every render in flight fails with the same broken pool
+            results = await asyncio.gather(*(renderer.render(os._exit, 1) for _ in range(4)), return_exceptions=True)
+            assert all(isinstance(result, BrokenProcessPool) for result in results)
+            assert renderer.stats()['restarts'] == 1
+            assert renderer.executor is not broken and broken._shutdown_thread
+            assert renderer.executor._mp_context.get_start_method() in ('forkserver', 'spawn')
+            assert await renderer.render(os.getpid) != os.getpid()
+        finally:
+            renderer.shutdown()
+    asyncio.run(scenario())
@@ -0,0 +1,28 @@
+from collections import defaultdict
+
+import pytest
+
+pytest.importorskip('discord')
+import replay
+
+def test_over_budget_counts_sends_the_bucket_refuses():
+    assert replay.over_budget([0.0] * 5, 5, 5) == 0
+    assert replay.over_budget([0.0] * 8, 5, 5) == 3
+    assert replay.over_budget([0.0] * 5 + [1.0], 5, 5) == 0  # One token back after a second
+
+def test_500_join_burst_shares_messages_within_the_rate_limits(felv2, monkeypatch):
+    # Same buckets as the bot, on a tenth of the time scale, so the burst drains in about a second
+    monkeypatch.setattr(felv2, 'channel_limiters', defaultdict(lambda: felv2.RateLimiter(5, 0.5)))
+    monkeypatch.setattr(felv2, 'global_limiter', felv2.RateLimiter(45, 0.1))
+    monkeypatch.setattr(felv2, 'join_pipeline', felv2.JoinPipeline())
+    monkeypatch.setattr(felv2, 'JOIN_BATCH_SECONDS', 0.05)
+    monkeypatch.setattr(felv2, 'LOG_FLUSH_SECONDS', 0.05)
+
+    row = replay.join_burst(felv2, 500, 0.0)
+    assert row['processed'] == row['associated'] == 500
+    assert row['batches'] == 1
+    # 50 members per shared welcome, and 25-field join summaries packed into multi-embed log messages
+    assert row['messages_sent']['barricade'] == 10
+    assert row['messages_sent']['logs'] <= 3
+    assert row['over_budget'] == {'logs': 0, 'barricade': 0, 'global': 0}
+    assert row['max_latency_s'] < 2
@@ -0,0 +1,27 @@
+import sys, threading
+
+def test_first_use_from_many_threads_imports_once(felv2, tmp_path, monkeypatch):
+    # A module that is slow to import and counts how often it ran, like numpy's first import on executor threads
+    runs = tmp_path / 'runs'
+    (tmp_path / 'slow_module.py').write_text(
+        "import time\n"
+        f"open({str(runs)!r}, 'a').write('run\\n')\n"
+        "time.sleep(0.2)\n"
+        "value = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, 'slow_module', raising=False)
+
+    module = felv2.LazyModule('slow_module')
+    start = threading.Barrier(8)
+    seen = []
+    def use():
+        start.wait()
+        seen.append(module.value)
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen == [42] * 8
+    assert runs.read_text().splitlines() == ['run']
@@ -0,0 +1,77 @@
+import asyncio, types
+
+import pytest
+
+discord = pytest.importorskip('discord')
+from discord.ui.view import ViewStore
+
+class ClickResponse:
+    def __init__(self):
+        self.messages = []
+        self.modals = []
+
+    def is_done(self):
+        return bool(self.messages or self.modals)
+
+    async def send_message(self, content=None, **kwargs):
+        self.messages.append((content, kwargs))
+
+    async def send_modal(self, modal):
+        self.modals.append(modal)
+
+class Click:
+    # The parts of an Interaction that ViewStore.dispatch and the component callbacks read
+    def __init__(self, message_id, user_id, values=()):
+        self.message = types.SimpleNamespace(id=message_id)
+        self.user = types.SimpleNamespace(id=user_id)
+        self.data = {'values': list(values)}
+        self.response = ClickResponse()
+        self.view = None
+
+    def get(self, key, default=None):
+        # Select.refresh_state reads the payload straight off anything that isn't a real Interaction
+        return self.data.get(key, default)
+
+def register(felv2):
+    # A fresh view store holding the views on_ready registers; views need a running loop to be built
+    state = felv2.bot._connection
+    state._view_store = ViewStore(state)
+    for view_class in felv2.PERSISTENT_VIEWS:
+        felv2.bot.add_view(view_class())
+    return state._view_store
+
+def send(felv2, view, message_id):
+    # What Messageable.send and webhook followups do with the view once the message exists
+    if view.is_dispatchable():
+        felv2.bot._connection.store_view(view, message_id)
+
+async def click(store, component_type, custom_id, interaction):
+    store.dispatch(component_type.value, custom_id, interaction)
+    for _ in range(5):  # The view runs the callback in its own task
+        await asyncio.sleep(0)
+    return interaction.response
+
+def test_unlock_on_a_posted_barricade_reaches_the_registered_view(felv2):
+    async def scenario():
+        store = register(felv2)
+        registered = len(store._views)
+        for message_id in range(1000, 1100):
+            send(felv2, felv2.view_template(felv2.UnlockView), message_id)
+        assert len(store._views) == registered
+
+        felv2.associations.link(1050, 77)
+        response = await click(store, discord.ComponentType.button, 'unlock_access', Click(1050, 77))
+        assert [content for content, _ in response.messages] == ["Please choose an option:"]
+        assert isinstance(response.messages[0][1]['view'], felv2.InitialChoicesView)
+
+        response = await click(store, discord.ComponentType.button, 'unlock_access', Click(1050, 78))
+        assert [content for content, _ in response.messages] == ["This button isn't for you!"]
+    asyncio.run(scenario())
+
+def test_register_select_on_a_followup_opens_the_modal(felv2):
+    async def scenario():
+        store = register(felv2)
+        send(felv2, felv2.view_template(felv2.RegisterSelectView), 2000)
+        response = await click(store, discord.ComponentType.string_select, 'register_select', Click(2000, 77, ['Research']))
+        assert len(response.modals) == 1 and response.modals[0].speedup_type == 'research'
+    asyncio.run(scenario())
@@ -0,0 +1,58 @@
+import asyncio, threading
+
+import pytest
+
+pytest.importorskip('discord')
+from replay import FakeTable
+
+class RacingTable(FakeTable):
+    # Holds the first read of every caller at a barrier, so they all miss and all try to create the record
+    def __init__(self, parties):
+        super().__init__()
+        self.barrier = threading.Barrier(parties, timeout=5)
+        self.lock = threading.Lock()
+        self.puts = 0
+
+    def get_item(self, Key, ConsistentRead=False):
+        response = super().get_item(Key, ConsistentRead)
+        if not ConsistentRead:
+            self.barrier.wait()
+        return response
+
+    def put_item(self, Item, ConditionExpression=None):
+        with self.lock:  # DynamoDB evaluates the condition and the write atomically
+            self.puts += 1
+            super().put_item(Item, ConditionExpression)
+
+def test_concurrent_first_requests_share_one_key(felv2):
+    table = RacingTable(parties=4)
+    store = felv2.UserKeyStore(lambda: table, 4, 16)
+
+    async def race():
+        return await asyncio.gather(*(store.get_key(42, 'player42') for _ in range(4)))
+
+    keys = asyncio.run(race())
+    assert table.puts == 4
+    assert len(set(keys)) == 1
+    assert table.items[42]['key'] == keys[0]
+
+def test_cache_evicts_least_recently_used(felv2):
+    table = FakeTable()
+    store = felv2.UserKeyStore(lambda: table, 1, 2)
+
+    async def lookups():
+        first = await store.get_key(1, 'player1')
+        await store.get_key(2, 'player2')
+        assert await store.get_key(1, 'player1') == first  # Hit, and 1 becomes most recently used
+        await store.get_key(3, 'player3')  # Evicts 2
+        return first
+
+    first = asyncio.run(lookups())
+    assert list(store.cache) == [1, 3]
+    assert (store.hits, store.misses) == (1, 3)
+
+    # An evicted user is read back from the table, not given a new key
+    second = table.items[2]['key']
+    assert asyncio.run(store.get_key(2, 'player2')) == second
+    assert list(store.cache) == [3, 2]
+    assert table.items[1]['key'] == first
@@ -0,0 +1,34 @@
+import asyncio, logging, random
+
+import pytest
+
+pytest.importorskip('discord')
+import replay
+
+def test_week_heatmap_failure_after_the_budget_is_logged(felv2, monkeypatch, caplog):
+    async def slow_failure(start_date, backend=None):
+        await asyncio.sleep(0.05)
+        raise RuntimeError("renderer died")
+    monkeypatch.setattr(felv2, 'week_heatmap_png', slow_failure)
+    monkeypatch.setattr(felv2, 'WEEK_HEATMAP_BUDGET_SECONDS', 0.01)
+
+    async def scenario():
+        guild = replay.FakeGuild(felv2.ALLIANCE_ID, 0)
+        ctx = replay.FakeContext(felv2.bot, guild, replay.FakeMember(guild, 1, 'member'))
+        await felv2.poll_availability_week.callback(ctx, '10/20', None)
+        assert [content for content, _ in ctx.responses] == ["The weekly heatmap is still being prepared, please try again in a few seconds."]
+        await asyncio.sleep(0.1)
+    with caplog.at_level(logging.ERROR, logger='felv2'):
+        asyncio.run(scenario())
+    assert any("failed after its budget: renderer died" in record.getMessage() for record in caplog.records)
+
+def test_week_heatmap_check_counts_renders_past_the_budget(felv2, monkeypatch):
+    async def slow_render(start_date, backend=None):
+        await asyncio.sleep(0.05)
+        return b''
+    monkeypatch.setattr(felv2, 'week_heatmap_png', slow_render)
+    monkeypatch.setattr(felv2, 'WEEK_HEATMAP_BUDGET_SECONDS', 0.01)
+    assert replay.week_heatmap_check(felv2, 50, 3, 0, random.Random(1))['over_budget'] == 3
+
+    monkeypatch.setattr(felv2, 'WEEK_HEATMAP_BUDGET_SECONDS', 1.0)
+    assert replay.week_heatmap_check(felv2, 50, 3, 0, random.Random(1))['over_budget'] == 0